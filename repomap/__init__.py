@@ -19,78 +19,132 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
-import os
-import sys
-from pathlib import Path
+import importlib
 
 __version__ = "0.1.2"
 
 # Add constants for backwards compatibility
-CACHE_VERSION = 3
+CACHE_VERSION = 7
 
-# Core functionality (backwards compatibility)
-from .repomap import RepoMap, Tag
-from .models import Model, get_token_counter
-from .io_utils import InputOutput, default_io
+# Public names are imported on first access (PEP 562) so that a plain
+# ``import repomap`` does not pull in every submodule and grep_ast.
+_LAZY = {
+    # Core functionality (backwards compatibility)
+    "RepoMap": (".repomap", "RepoMap"),
+    "Tag": (".repomap", "Tag"),
+    "Model": (".models", "Model"),
+    "get_token_counter": (".models", "get_token_counter"),
+    "InputOutput": (".io_utils", "InputOutput"),
+    "default_io": (".io_utils", "default_io"),
+    "main": (".__main__", "main"),
 
-# Importing main function for backward compatibility
-try:
-    from .repomap import main
-except ImportError:
-    from .__main__ import main
+    # New modular exports
+    "TreeNode": (".modules.models", "TreeNode"),
+    "get_rel_fname": (".modules.file_utils", "get_rel_fname"),
+    "get_mtime": (".modules.file_utils", "get_mtime"),
+    "file_digest": (".modules.file_utils", "file_digest"),
+    "file_ext": (".modules.file_utils", "file_ext"),
+    "find_src_files": (".modules.file_utils", "find_src_files"),
+    "expand_globs": (".modules.file_utils", "expand_globs"),
+    "find_common_root": (".modules.file_utils", "find_common_root"),
+    "is_text_file": (".modules.file_utils", "is_text_file"),
+    "is_binary_file": (".modules.file_utils", "is_binary_file"),
+    "find_binary_files": (".modules.file_utils", "find_binary_files"),
+    "is_image_file": (".modules.file_utils", "is_image_file"),
+    "StatCache": (".modules.file_utils", "StatCache"),
+    "get_tags": (".modules.parsers", "get_tags"),
+    "get_tags_raw": (".modules.parsers", "get_tags_raw"),
+    "get_scm_fname": (".modules.parsers", "get_scm_fname"),
+    "parse_files": (".modules.parsers", "parse_files"),
+    "format_tag_list": (".modules.visualization", "format_tag_list"),
+    "format_file_list_by_extension": (".modules.visualization", "format_file_list_by_extension"),
+    "format_token_count": (".modules.visualization", "format_token_count"),
+
+    # Tree-sitter helpers from grep_ast (dummy fallbacks when unavailable)
+    "get_language": ("grep_ast.tsl", "get_language"),
+    "get_parser": ("grep_ast.tsl", "get_parser"),
+}
+
+
+def _get_language_fallback(lang_id):
+    return None
+
+
+def _get_parser_fallback(lang_id):
+    return None
+
+
+_FALLBACKS = {
+    "get_language": _get_language_fallback,
+    "get_parser": _get_parser_fallback,
+}
+
+
+def __getattr__(name):
+    """Import public names lazily on first access."""
+    try:
+        module_name, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+    except ImportError:
+        if name not in _FALLBACKS:
+            raise
+        value = _FALLBACKS[name]
+
+    # Cache on the module so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+# Extension to language mapping used by filename_to_lang
+_EXT_TO_LANG = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+    '.java': 'java',
+    '.c': 'c',
+    '.h': 'c',
+    '.cpp': 'cpp',
+    '.hpp': 'cpp',
+    '.cs': 'csharp',
+    '.rs': 'rust',
+    '.go': 'go',
+    '.rb': 'ruby',
+    '.php': 'php',
+    '.sh': 'bash',
+    '.html': 'html',
+    '.css': 'css',
+    '.md': 'markdown',
+    '.json': 'json',
+    '.yml': 'yaml',
+    '.yaml': 'yaml',
+    '.xml': 'xml'
+}
 
 # For backward compatibility
-def filename_to_lang(filename):
+def filename_to_lang(filename, _ext_to_lang=_EXT_TO_LANG):
     """Map filename to language."""
-    ext = os.path.splitext(filename)[1].lower()
-    ext_to_lang = {
-        '.py': 'python',
-        '.js': 'javascript',
-        '.ts': 'typescript',
-        '.tsx': 'typescript',
-        '.java': 'java',
-        '.c': 'c',
-        '.h': 'c',
-        '.cpp': 'cpp',
-        '.hpp': 'cpp',
-        '.cs': 'csharp',
-        '.rs': 'rust',
-        '.go': 'go',
-        '.rb': 'ruby',
-        '.php': 'php',
-        '.sh': 'bash',
-        '.html': 'html',
-        '.css': 'css',
-        '.md': 'markdown',
-        '.json': 'json',
-        '.yml': 'yaml',
-        '.yaml': 'yaml',
-        '.xml': 'xml'
-    }
-    return ext_to_lang.get(ext)
-
-# New modular exports
-# Import specific utilities from modules
-from .modules.models import TreeNode
-from .modules.file_utils import (
-    get_rel_fname, get_mtime, find_src_files,
-    expand_globs, find_common_root, is_text_file,
-    is_binary_file, is_image_file
-)
-from .modules.parsers import get_tags, get_tags_raw, get_scm_fname
-from .modules.visualization import (
-    format_tag_list, format_file_list_by_extension, format_token_count
-)
-
-try:
-    from grep_ast.tsl import get_language, get_parser
-except ImportError:
-    # Fall back to dummy implementations
-    def get_language(lang_id):
-        return None
-    
-    def get_parser(lang_id):
-        return None
+    # A suffix containing a path separator never matches a mapped extension
+    dot = filename.rfind('.')
+    return _ext_to_lang.get(filename[dot:].lower()) if dot >= 0 else None
+
+
+# Bytes-keyed copy of the extension mapping for filename_to_lang_bytes
+_EXT_TO_LANG_BYTES = {ext.encode(): lang for ext, lang in _EXT_TO_LANG.items()}
+
+
+def filename_to_lang_bytes(filename, _ext_to_lang=_EXT_TO_LANG_BYTES):
+    """Map a bytes filename (e.g. from os.scandir(bytes_path)) to language without decoding it."""
+    dot = filename.rfind(b'.')
+    return _ext_to_lang.get(filename[dot:].lower()) if dot >= 0 else None
 
 __all__ = [
     # Core
@@ -100,13 +154,13 @@ __all__ = [
     "main", "CACHE_VERSION",
     
     # File utilities
-    "find_src_files", "get_rel_fname", "get_mtime", 
+    "find_src_files", "get_rel_fname", "get_mtime", "file_digest", "file_ext",
     "expand_globs", "find_common_root",
-    "is_text_file", "is_binary_file", "is_image_file",
-    "filename_to_lang",
+    "is_text_file", "is_binary_file", "find_binary_files", "is_image_file", "StatCache",
+    "filename_to_lang", "filename_to_lang_bytes",
     
     # Parsing
-    "get_tags", "get_tags_raw", "get_scm_fname",
+    "get_tags", "get_tags_raw", "get_scm_fname", "parse_files",
     "get_language", "get_parser",
     
     # Visualization
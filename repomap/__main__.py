@@ -11,10 +11,37 @@ from .modules.core import RepoMap
 from .modules.file_utils import expand_globs
 from .io_utils import InputOutput
 
+
+def _peak_memory_mb():
+    """
+    Return the peak resident memory of this process in megabytes.
+
+    Uses the standard library resource module on POSIX and only falls back to
+    psutil (imported lazily) where resource is unavailable, e.g. on Windows.
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+
 def main():
     """Main function for the command line interface."""
     parser = argparse.ArgumentParser(
-        description="RepoMap: Generate maps of repositories for easy understanding."
+        description="RepoMap: Generate maps of repositories for easy understanding.",
+        epilog="Git URLs are cloned into ~/.cache/repomap/clones (under $XDG_CACHE_HOME "
+               "if set) and reused on later runs. The cache holds up to 2 GiB; set "
+               "REPOMAP_CLONE_CACHE_MAX_BYTES to change the limit, or to 0 to clone "
+               "into a temporary directory instead."
     )
     parser.add_argument(
         "files", nargs="*", help="Files or directories to include in the map"
@@ -44,54 +71,78 @@ def main():
     parser.add_argument(
         "--skip-git", action="store_true", help="Skip git-related files and directories"
     )
+    parser.add_argument(
+        "--track-memory", action="store_true",
+        help="Report peak memory usage (requires --verbose)"
+    )
     args = parser.parse_args()
+    track_memory = args.verbose and args.track_memory
 
-    io = InputOutput(quiet=not args.verbose)
-    
-    if args.debug:
-        try:
-            from grep_ast.tsl import get_language_ids
-            parsers = get_language_ids()
-            print("Available language parsers:")
-            for p in sorted(parsers):
-                print(f"  - {p}")
-            print()
-        except ImportError:
-            print("Warning: grep_ast.tsl not available, some features will be limited.")
-    
-    if not args.files:
-        parser.print_help()
-        return 1
-    
-    repo_map = RepoMap(
-        io=io,
-        verbose=args.verbose,
-        debug=args.debug,
-        map_tokens=args.tokens,
-        disable_splitting=args.no_splitting,
-        skip_tests=args.skip_tests,
-        skip_docs=args.skip_docs,
-        skip_git=args.skip_git
-    )
-    
-    expanded_files = []
-    for pattern in args.files:
-        expanded_files.extend(expand_globs([pattern], root=repo_map.root))
-    
-    if not expanded_files:
-        print(f"Error: No files found matching: {', '.join(args.files)}")
-        return 1
-    
-    output = repo_map.get_repo_map(expanded_files)
-    
-    if args.output:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(output)
-        print(f"Repository map written to {args.output}")
-    else:
-        print(output)
+    io = InputOutput(quiet=not args.verbose, buffered=True)
     
-    return 0
+    # Buffered status lines are written out even if mapping fails or is
+    # interrupted
+    try:
+        if args.debug:
+            try:
+                from grep_ast.tsl import get_language_ids
+                parsers = get_language_ids()
+                print("Available language parsers:")
+                for p in sorted(parsers):
+                    print(f"  - {p}")
+                print()
+            except ImportError:
+                print("Warning: grep_ast.tsl not available, some features will be limited.")
+        
+        if not args.files:
+            parser.print_help()
+            return 1
+        
+        repo_map = RepoMap(
+            io=io,
+            verbose=args.verbose,
+            debug=args.debug,
+            map_tokens=args.tokens,
+            disable_splitting=args.no_splitting,
+            skip_tests=args.skip_tests,
+            skip_docs=args.skip_docs,
+            skip_git=args.skip_git
+        )
+        
+        expanded_files = []
+        for pattern in args.files:
+            expanded_files.extend(expand_globs([pattern], root=repo_map.root))
+        
+        if not expanded_files:
+            io.flush()
+            print(f"Error: No files found matching: {', '.join(args.files)}")
+            return 1
+        
+        if track_memory:
+            memory_before = _peak_memory_mb()
+        
+        output = repo_map.get_repo_map(expanded_files)
+        
+        if track_memory:
+            memory_after = _peak_memory_mb()
+            if memory_after is not None:
+                io.tool_output(
+                    f"Peak memory: {memory_after:.1f} MB "
+                    f"(+{memory_after - memory_before:.1f} MB while mapping)"
+                )
+        
+        io.flush()
+        
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output)
+            print(f"Repository map written to {args.output}")
+        else:
+            print(output)
+        
+        return 0
+    finally:
+        io.flush()
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -4,12 +4,212 @@ Advanced AST Parser for Python code analysis.
 Provides comprehensive code search and extraction features.
 """
 import ast
+import codecs
+import hashlib
+import os
 import sys
 import re
+import json
 import argparse
+import tokenize
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import accumulate, islice
+from io import BytesIO
 from pathlib import Path
-from collections import OrderedDict
-from typing import List, Dict, Any, Optional, Tuple, Set, Union
+from collections import OrderedDict, deque
+from typing import Callable, Iterator, List, Dict, Any, Optional, Sequence, Tuple, Set, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# AST fields that hold lists of statements (or except handlers / match cases,
+# which in turn hold statements). Definitions can only appear in these lists.
+_STATEMENT_LIST_FIELDS = ('body', 'handlers', 'orelse', 'finalbody', 'cases')
+
+# Statement-list fields present on each node type, filled in on first use.
+# Simple statements map to an empty tuple and are not probed at all.
+_STATEMENT_FIELDS_BY_TYPE: Dict[type, Tuple[str, ...]] = {}
+
+# Callable objects (functions, methods, classes)
+_CALLABLE_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def _get_decorator_line(node: ast.AST) -> int:
+    """Return the line of a callable's first decorator, or its own line if undecorated."""
+    # If the node has decorators, adjust line numbers to include them
+    if node.decorator_list:
+        return node.decorator_list[0].lineno
+    return node.lineno
+
+
+def _iter_statements(module_node: ast.AST):
+    """
+    Yield statement nodes of a module in the same breadth-first order as ast.walk.
+    
+    Expression subtrees are never entered because they cannot contain
+    definitions, imports or assignments, which removes most of the nodes
+    ast.walk would visit.
+    """
+    fields_by_type = _STATEMENT_FIELDS_BY_TYPE
+    queue = deque([module_node])
+    while queue:
+        node = queue.popleft()
+        yield node
+        node_type = type(node)
+        fields = fields_by_type.get(node_type)
+        if fields is None:
+            fields = fields_by_type[node_type] = tuple(
+                field for field in _STATEMENT_LIST_FIELDS if field in node_type._fields
+            )
+        for field in fields:
+            children = getattr(node, field)
+            if children:
+                queue.extend(children)
+
+
+# Files from this size on use numpy, when installed, to find line offsets
+_NUMPY_OFFSETS_MIN_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=None)
+def _get_numpy():
+    """Import numpy on first use, returning None if it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _line_offsets(data: bytes) -> array:
+    """
+    Return the start offset of every line in data, plus len(data) at the end.
+    
+    Line endings must already be normalised to b'\n'. Large files are scanned
+    with a vectorised numpy comparison when numpy is available.
+    """
+    offsets = array('I', [0])
+    np = _get_numpy() if len(data) >= _NUMPY_OFFSETS_MIN_SIZE else None
+    if np is not None:
+        newline_ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0x0A) + 1
+        offsets.extend(newline_ends.tolist())
+        if offsets[-1] != len(data):
+            offsets.append(len(data))
+    else:
+        offsets.extend(accumulate(map(len, data.splitlines(keepends=True))))
+    return offsets
+
+
+class _SourceLines(Sequence[str]):
+    """
+    Read-only sequence of source lines backed by the raw file contents.
+    
+    Only the start offset of each line is stored, in a compact array, and a
+    line is decoded from the bytes when it is accessed, so a large file is
+    never decoded as a whole and does not keep one string object per line.
+    """
+    
+    __slots__ = ('data', 'encoding', 'offsets')
+    
+    def __init__(self, data: bytes, encoding: str = 'utf-8'):
+        self.data = data
+        self.encoding = encoding
+        self.offsets = _line_offsets(data)
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, index):
+        data, encoding, offsets = self.data, self.encoding, self.offsets
+        if isinstance(index, slice):
+            return [data[offsets[i]:offsets[i + 1]].decode(encoding)
+                    for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('line index out of range')
+        return data[offsets[index]:offsets[index + 1]].decode(encoding)
+
+
+# Parsed files by content digest, used when a file's mtime changed but its
+# contents did not (e.g. after a checkout or a touch)
+_PARSED_BY_CONTENT: 'OrderedDict[tuple, tuple]' = OrderedDict()
+_PARSED_BY_CONTENT_SIZE = 256
+
+
+@lru_cache(maxsize=256)
+def _load_parsed(
+    filename: str,
+    mtime_ns: int,
+    size: int,
+    feature_version: Tuple[int, int],
+    type_comments: bool = False
+) -> Tuple[_SourceLines, Optional[ast.Module], Optional[SyntaxError]]:
+    """
+    Read and parse a source file, caching the result by (path, mtime, size).
+    
+    The modification time and size are only part of the cache key: callers
+    pass the values from a fresh os.stat so an edited file is read again.
+    If its contents hash to the same digest as an earlier read, the earlier
+    parse is reused instead of parsing again. The bytes are handed to
+    ast.parse directly and source lines are only decoded when they are
+    extracted.
+    
+    Args:
+        filename: Path to the Python file
+        mtime_ns: Modification time of the file in nanoseconds
+        size: Size of the file in bytes
+        feature_version: Python feature version for AST parsing
+        type_comments: Whether to parse '# type:' comments
+        
+    Returns:
+        Tuple of (source_lines, module_node, syntax_error); module_node is None
+        and syntax_error is set when the file cannot be parsed
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    
+    content_key = (filename, hashlib.blake2b(data).digest(), feature_version, type_comments)
+    parsed = _PARSED_BY_CONTENT.get(content_key)
+    if parsed is not None:
+        _PARSED_BY_CONTENT.move_to_end(content_key)
+        return parsed
+    
+    parsed = _parse_source(filename, data, feature_version, type_comments)
+    _PARSED_BY_CONTENT[content_key] = parsed
+    if len(_PARSED_BY_CONTENT) > _PARSED_BY_CONTENT_SIZE:
+        _PARSED_BY_CONTENT.popitem(last=False)
+    return parsed
+
+
+def _parse_source(
+    filename: str,
+    data: bytes,
+    feature_version: Tuple[int, int],
+    type_comments: bool
+) -> Tuple[_SourceLines, Optional[ast.Module], Optional[SyntaxError]]:
+    """Index the lines of raw file contents and parse them; see _load_parsed."""
+    if b'\r' in data:
+        # Same newline translation as reading in text mode
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    encoding, _ = tokenize.detect_encoding(BytesIO(data).readline)
+    if encoding == 'utf-8-sig':
+        data = data[len(codecs.BOM_UTF8):]
+        encoding = 'utf-8'
+    
+    source_lines = _SourceLines(data, encoding)
+    try:
+        module_node = ast.parse(data, filename=str(filename),
+                                type_comments=type_comments,
+                                feature_version=feature_version)
+    except SyntaxError as e:
+        return source_lines, None, e
+    return source_lines, module_node, None
 
 
 def get_source_lines(filename: str) -> List[str]:
@@ -23,16 +223,29 @@ def get_source_lines(filename: str) -> List[str]:
         return []
 
 
-def match_name_pattern(node_name: str, pattern: str) -> bool:
+@lru_cache(maxsize=256)
+def _compile_name_pattern(pattern: str) -> Callable[[str], bool]:
     """
-    Match a node name against a pattern, supporting wildcards.
+    Build a predicate matching node names against a pattern.
+    
+    '*' matches everything and patterns without special characters are
+    compared for equality, so only real wildcard patterns use a regex.
     """
     if pattern == '*':
-        return True
+        return lambda node_name: True
+    if re.escape(pattern) == pattern:
+        return pattern.__eq__
     
     # Convert glob-style pattern to regex
-    regex_pattern = pattern.replace('*', '.*').replace('?', '.')
-    return bool(re.fullmatch(regex_pattern, node_name))
+    regex = re.compile(pattern.replace('*', '.*').replace('?', '.'))
+    return lambda node_name: regex.fullmatch(node_name) is not None
+
+
+def match_name_pattern(node_name: str, pattern: str) -> bool:
+    """
+    Match a node name against a pattern, supporting wildcards.
+    """
+    return _compile_name_pattern(pattern)(node_name)
 
 
 def extract_line_range(
@@ -44,7 +257,7 @@ def extract_line_range(
     Extract the line range and source code for a given AST node or node info dict.
     
     Args:
-        node: The AST node or a dictionary with lineno and end_lineno keys
+        node: The AST node, a NodeInfo or a dictionary with lineno and end_lineno keys
         source_lines: Source code lines
         context_lines: Number of context lines to include before and after
         
@@ -57,11 +270,12 @@ def extract_line_range(
             return (0, 0, [])
         start_line = max(0, node['lineno'] - 1)  # Convert to 0-based indexing
         end_line = node['end_lineno']  # Already 0-based when accessing list
-    elif hasattr(node, 'lineno') and hasattr(node, 'end_lineno'):
-        start_line = max(0, node.lineno - 1)  # Convert to 0-based indexing
-        end_line = node.end_lineno  # Already 0-based when accessing list
     else:
-        return (0, 0, [])
+        try:
+            start_line = max(0, node.lineno - 1)  # Convert to 0-based indexing
+            end_line = node.end_lineno  # Already 0-based when accessing list
+        except AttributeError:
+            return (0, 0, [])
     
     # Add context if requested
     context_start = max(0, start_line - context_lines)
@@ -75,13 +289,147 @@ def extract_line_range(
     return (context_start + 1, context_end, code_lines)
 
 
+class NodeInfo:
+    """
+    Metadata of a matched code element.
+    
+    A __slots__ class keeps the per-match footprint well below a dict. The
+    optional fields (original_lineno, module, duplicate_index) are simply
+    left unset when they do not apply, and the mapping-style accessors keep
+    node['name'], node.get(...) and 'module' in node working.
+    """
+    
+    __slots__ = ('name', 'type', 'lineno', 'original_lineno', 'end_lineno',
+                 'is_callable', 'module', 'duplicate_index')
+    
+    def __init__(self, name: str, type: str, lineno: int, end_lineno: int,
+                 is_callable: bool, original_lineno: Optional[int] = None,
+                 module: Optional[str] = None):
+        self.name = name
+        self.type = type
+        self.lineno = lineno
+        self.end_lineno = end_lineno
+        self.is_callable = is_callable
+        if original_lineno is not None:
+            self.original_lineno = original_lineno
+        if module is not None:
+            self.module = module
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ and hasattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the field if it is set, else default."""
+        return getattr(self, key, default) if key in self.__slots__ else default
+    
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{key}={getattr(self, key)!r}"
+                           for key in self.__slots__ if hasattr(self, key))
+        return f"NodeInfo({fields})"
+
+
+def _callable_info(node: ast.AST) -> NodeInfo:
+    """Build the metadata of a function, method or class node."""
+    return NodeInfo(
+        node.name,
+        node.__class__.__name__,
+        # Line number adjusted to include decorators
+        _get_decorator_line(node),
+        node.end_lineno,
+        True,
+        original_lineno=node.lineno,  # Save the original line number before decorator adjustment
+    )
+
+
+def _non_callable_info(
+    node: ast.AST,
+    matches: Callable[[str], bool]
+) -> Optional[NodeInfo]:
+    """Build the metadata of a variable, import, global or attribute node if its name matches."""
+    node_info = None
+    
+    # Assignments (variables, constants)
+    if isinstance(node, ast.Assign):
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if matches(target.id):
+                    node_name = target.id
+                    node_info = NodeInfo(node_name, 'Variable', node.lineno, node.end_lineno, False)
+    
+    # Import statements
+    elif isinstance(node, ast.Import):
+        for name in node.names:
+            alias = name.asname or name.name
+            if matches(alias):
+                node_name = alias
+                node_info = NodeInfo(node_name, 'Import', node.lineno, node.end_lineno, False)
+    
+    # Import from statements
+    elif isinstance(node, ast.ImportFrom):
+        for name in node.names:
+            alias = name.asname or name.name
+            if matches(alias):
+                node_name = alias
+                node_info = NodeInfo(
+                    node_name, 'ImportFrom', node.lineno, node.end_lineno, False,
+                    module=node.module or ''
+                )
+    
+    # Global variables
+    elif isinstance(node, ast.Global):
+        for name in node.names:
+            if matches(name):
+                node_name = name
+                node_info = NodeInfo(node_name, 'Global', node.lineno, node.end_lineno, False)
+    
+    # Class attributes
+    elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        if matches(node.target.id):
+            node_name = node.target.id
+            node_info = NodeInfo(node_name, 'Attribute', node.lineno, node.end_lineno, False)
+    
+    return node_info
+
+
+def _find_callables(
+    module_node: ast.AST,
+    matches: Callable[[str], bool]
+) -> Iterator[NodeInfo]:
+    """Yield the metadata of matching callables only."""
+    for node in _iter_statements(module_node):
+        if isinstance(node, _CALLABLE_TYPES) and matches(node.name):
+            yield _callable_info(node)
+
+
+def _find_all(
+    module_node: ast.AST,
+    matches: Callable[[str], bool]
+) -> Iterator[NodeInfo]:
+    """Yield the metadata of matching callables and non-callables."""
+    for node in _iter_statements(module_node):
+        if isinstance(node, _CALLABLE_TYPES):
+            if matches(node.name):
+                yield _callable_info(node)
+        else:
+            node_info = _non_callable_info(node, matches)
+            if node_info is not None:
+                yield node_info
+
+
 def find_nodes(
     source: str, 
     filename: str,
     name_pattern: str = '*',
     include_non_callables: bool = False,
-    feature_version: Tuple[int, int] = (3, 10)
-) -> List[Dict[str, Any]]:
+    feature_version: Tuple[int, int] = (3, 10),
+    type_comments: bool = False
+) -> List[NodeInfo]:
     """
     Find nodes in source code matching the given pattern.
     
@@ -91,153 +439,97 @@ def find_nodes(
         name_pattern: Pattern to match node names (supports wildcards)
         include_non_callables: Whether to include non-callable nodes
         feature_version: Python feature version for AST parsing
+        type_comments: Whether to parse '# type:' comments (not needed for the search)
         
     Returns:
         List of matching nodes with metadata
     """
     try:
         module_node = ast.parse(source, filename=str(filename), 
-                               type_comments=True, 
+                               type_comments=type_comments, 
                                feature_version=feature_version)
     except SyntaxError as e:
         print(f"Syntax error in {filename}: {e}", file=sys.stderr)
         return []
     
-    result = []
+    return find_nodes_from_ast(
+        module_node,
+        name_pattern=name_pattern,
+        include_non_callables=include_non_callables
+    )
+
+
+def iter_nodes_from_ast(
+    module_node: ast.AST,
+    name_pattern: str = '*',
+    include_non_callables: bool = False
+) -> Iterator[NodeInfo]:
+    """
+    Yield nodes in an already parsed module matching the given pattern.
+    
+    Nodes are produced one at a time as the module is walked, so callers can
+    stop early or transform them without building the full list first.
+    
+    Args:
+        module_node: Parsed module, e.g. from ast.parse
+        name_pattern: Pattern to match node names (supports wildcards)
+        include_non_callables: Whether to include non-callable nodes
+        
+    Yields:
+        Matching nodes with metadata
+    """
+    matches = _compile_name_pattern(name_pattern)
     
     # Track unique names to detect duplicates
     seen_names = {}
     
-    # Find callable objects (functions, methods, classes)
-    callable_types = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
-    
-    # Helper to check for decorators and adjust line numbers
-    def get_decorator_line(node):
-        # If the node has decorators, adjust line numbers to include them
-        if hasattr(node, 'decorator_list') and node.decorator_list:
-            # Find the first decorator's line number
-            first_decorator = node.decorator_list[0]
-            if hasattr(first_decorator, 'lineno'):
-                return first_decorator.lineno
-        return getattr(node, 'lineno', 0)
-    
-    # Process all nodes in the AST
-    for node in ast.walk(module_node):
-        node_info = None
-        
-        # Handle callables
-        if isinstance(node, callable_types):
-            if match_name_pattern(node.name, name_pattern):
-                # Get line number adjusting for decorators
-                start_line = get_decorator_line(node)
-                original_lineno = getattr(node, 'lineno', 0)
-                
-                node_info = {
-                    'name': node.name,
-                    'type': node.__class__.__name__,
-                    'lineno': start_line,
-                    'original_lineno': original_lineno,  # Save the original line number before decorator adjustment
-                    'end_lineno': getattr(node, 'end_lineno', 0),
-                    'is_callable': True,
-                }
+    # The callable-only search skips the non-callable checks entirely
+    find = _find_all if include_non_callables else _find_callables
+    
+    # Process all statements in the AST
+    for node_info in find(module_node, matches):
+        # Check for duplicates
+        name = node_info.name
+        duplicate_count = seen_names.get(name, 0)
+        seen_names[name] = duplicate_count + 1
+        if duplicate_count:
+            # For duplicates, add an index to make the name unique
+            node_info.duplicate_index = duplicate_count
         
-        # Handle non-callables if requested
-        elif include_non_callables:
-            node_name = None
-            
-            # Assignments (variables, constants)
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        if match_name_pattern(target.id, name_pattern):
-                            node_name = target.id
-                            node_info = {
-                                'name': node_name,
-                                'type': 'Variable',
-                                'lineno': getattr(node, 'lineno', 0),
-                                'end_lineno': getattr(node, 'end_lineno', 0),
-                                'is_callable': False,
-                            }
-            
-            # Import statements
-            elif isinstance(node, ast.Import):
-                for name in node.names:
-                    alias = name.asname or name.name
-                    if match_name_pattern(alias, name_pattern):
-                        node_name = alias
-                        node_info = {
-                            'name': node_name,
-                            'type': 'Import',
-                            'lineno': getattr(node, 'lineno', 0),
-                            'end_lineno': getattr(node, 'end_lineno', 0),
-                            'is_callable': False,
-                        }
-            
-            # Import from statements
-            elif isinstance(node, ast.ImportFrom):
-                for name in node.names:
-                    alias = name.asname or name.name
-                    if match_name_pattern(alias, name_pattern):
-                        node_name = alias
-                        node_info = {
-                            'name': node_name,
-                            'type': 'ImportFrom',
-                            'lineno': getattr(node, 'lineno', 0),
-                            'end_lineno': getattr(node, 'end_lineno', 0),
-                            'is_callable': False,
-                            'module': node.module or '',
-                        }
-            
-            # Global variables
-            elif isinstance(node, ast.Global):
-                for name in node.names:
-                    if match_name_pattern(name, name_pattern):
-                        node_name = name
-                        node_info = {
-                            'name': node_name,
-                            'type': 'Global',
-                            'lineno': getattr(node, 'lineno', 0),
-                            'end_lineno': getattr(node, 'end_lineno', 0),
-                            'is_callable': False,
-                        }
-            
-            # Class attributes
-            elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
-                if match_name_pattern(node.target.id, name_pattern):
-                    node_name = node.target.id
-                    node_info = {
-                        'name': node_name,
-                        'type': 'Attribute',
-                        'lineno': getattr(node, 'lineno', 0),
-                        'end_lineno': getattr(node, 'end_lineno', 0),
-                        'is_callable': False,
-                    }
-        
-        # Add the node if it matched
-        if node_info:
-            # Check for duplicates
-            if node_info['name'] in seen_names:
-                # For duplicates, add an index to make the name unique
-                duplicate_count = seen_names[node_info['name']]
-                seen_names[node_info['name']] = duplicate_count + 1
-                node_info['duplicate_index'] = duplicate_count
-            else:
-                seen_names[node_info['name']] = 1
-            
-            result.append(node_info)
+        yield node_info
+
+
+def find_nodes_from_ast(
+    module_node: ast.AST,
+    name_pattern: str = '*',
+    include_non_callables: bool = False,
+    max_results: Optional[int] = None
+) -> List[NodeInfo]:
+    """
+    Find nodes in an already parsed module matching the given pattern.
     
-    return result
+    Args:
+        module_node: Parsed module, e.g. from ast.parse
+        name_pattern: Pattern to match node names (supports wildcards)
+        include_non_callables: Whether to include non-callable nodes
+        max_results: Stop the search after this many matches (None for all)
+        
+    Returns:
+        List of matching nodes with metadata
+    """
+    nodes = iter_nodes_from_ast(module_node, name_pattern, include_non_callables)
+    return list(islice(nodes, max_results))
 
 
 def extract_signature(
-    node: Dict[str, Any],
+    node: Union[NodeInfo, Dict[str, Any]],
     source_lines: List[str]
 ) -> Tuple[int, int, List[str]]:
     """
     Extract the signature of a callable element including any decorators.
     
     Args:
-        node: Dictionary with node information
+        node: NodeInfo or dictionary with node information
         source_lines: Source code lines
         
     Returns:
@@ -309,12 +601,8 @@ def format_code_with_line_numbers(
     padding = len(str(max_line))
     
     # Format each line with line number
-    formatted_lines = []
-    for i, line in enumerate(code_lines):
-        line_num = start_line + i
-        formatted_lines.append(f"{line_num:{padding}} 〉{line}")
-    
-    return ''.join(formatted_lines)
+    fmt = f"{{:{padding}}} 〉{{}}".format
+    return ''.join(map(fmt, range(start_line, start_line + len(code_lines)), code_lines))
 
 
 def process_file(
@@ -326,7 +614,9 @@ def process_file(
     add_context: int = 0,
     add_line_numbers: bool = False,
     signature_only: bool = False,
-    feature_version: Tuple[int, int] = (3, 10)
+    feature_version: Tuple[int, int] = (3, 10),
+    max_results: Optional[int] = None,
+    type_comments: bool = False
 ) -> Dict[str, Any]:
     """
     Process a Python source file to find and extract code elements.
@@ -341,6 +631,8 @@ def process_file(
         add_line_numbers: Whether to add line numbers to the output
         signature_only: Only return the signature line (with decorators) of callable elements
         feature_version: Python feature version to use for parsing
+        max_results: Stop after this many matching elements (None for all)
+        type_comments: Whether to parse '# type:' comments (not needed for the search)
         
     Returns:
         Dictionary with results
@@ -351,37 +643,40 @@ def process_file(
         return {'error': f"File not found: {filename}"}
     
     try:
-        source = filepath.read_text(encoding='utf-8')
-        source_lines = source.splitlines(keepends=True)
+        st = os.stat(filename)
+        source_lines, module_node, syntax_error = _load_parsed(
+            str(filename), st.st_mtime_ns, st.st_size, tuple(feature_version),
+            type_comments
+        )
     except Exception as e:
         print(f"Error reading file '{filename}': {e}", file=sys.stderr)
         return {'error': f"Error reading file: {e}"}
     
-    # Find matching nodes
-    nodes = find_nodes(
-        source, 
-        filename,
-        name_pattern=name_pattern,
-        include_non_callables=include_non_callables,
-        feature_version=feature_version
-    )
-    
-    if not nodes:
-        if name_pattern == '*':
-            return {'error': f"No code elements found in {filename}."}
-        else:
-            return {'error': f"No elements matching '{name_pattern}' found in {filename}."}
+    # Find matching nodes, reusing the cached AST; they are streamed into
+    # the results below rather than collected in a list first
+    if syntax_error is not None:
+        print(f"Syntax error in {filename}: {syntax_error}", file=sys.stderr)
+        nodes = iter(())
+    else:
+        nodes = islice(
+            iter_nodes_from_ast(
+                module_node,
+                name_pattern=name_pattern,
+                include_non_callables=include_non_callables
+            ),
+            max_results
+        )
     
     results = []
     
     for node in nodes:
-        node_name = node['name']
-        start_line = node['lineno']
-        end_line = node['end_lineno']
-        node_type = node.get('type', 'Unknown')
+        node_name = node.name
+        start_line = node.lineno
+        end_line = node.end_lineno
+        node_type = node.type
         
         # Handle different output formats
-        if signature_only and node.get('is_callable', True):
+        if signature_only and node.is_callable:
             # Extract just the signature including decorators
             sig_start, sig_end, sig_lines = extract_signature(
                 node, 
@@ -438,7 +733,7 @@ def process_file(
                 'type': node_type,
                 'start_line': start_line,
                 'end_line': end_line,
-                'is_callable': node.get('is_callable', True)
+                'is_callable': node.is_callable
             }
             
             # Add module information for imports
@@ -447,9 +742,45 @@ def process_file(
         
         results.append(result_entry)
     
+    if not results:
+        if name_pattern == '*':
+            return {'error': f"No code elements found in {filename}."}
+        else:
+            return {'error': f"No elements matching '{name_pattern}' found in {filename}."}
+    
     return {'results': results, 'filename': filename}
 
 
+def process_files(
+    filenames: List[str],
+    jobs: Optional[int] = None,
+    chunksize: int = 8,
+    **kwargs: Any
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Process many Python source files, spreading them over a process pool.
+    
+    Each file is parsed and searched independently, so the work is split
+    across worker processes instead of running one file after another.
+    
+    Args:
+        filenames: Paths of the Python files
+        jobs: Number of worker processes (defaults to the CPU count, 1 runs serially)
+        chunksize: Number of files handed to a worker at a time
+        **kwargs: Options passed on to process_file
+        
+    Returns:
+        Dictionary mapping each filename to its process_file result
+    """
+    worker = partial(process_file, **kwargs)
+    if jobs == 1 or len(filenames) < 2:
+        return {filename: worker(filename) for filename in filenames}
+    
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        results = executor.map(worker, filenames, chunksize=chunksize)
+        return dict(zip(filenames, results))
+
+
 def print_results(
     results: Dict[str, Any], 
     line_numbers_only: bool = False, 
@@ -490,8 +821,59 @@ def print_results(
                     print(f"Found {node['type']} '{node['name']}' at lines {node['start_line']}-{node['end_line']}")
 
 
-def main():
-    """Main function for command-line usage."""
+def write_json(data: Any) -> None:
+    """
+    Write data to stdout as indented JSON.
+    
+    Uses orjson when it is installed, writing its bytes straight to the
+    underlying binary stream, and falls back to the standard json module.
+    """
+    stdout = sys.stdout
+    if orjson is not None and hasattr(stdout, 'buffer'):
+        stdout.flush()
+        stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2) + b"\n")
+        stdout.buffer.flush()
+    else:
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def _find_exact_callable(filename: str, name: str) -> int:
+    """
+    Print the first callable named exactly name, as older scripts expect.
+    
+    Returns:
+        0 if the callable was found, 1 otherwise
+    """
+    # Only the first callable is reported, so stop at the first exact match
+    results = process_file(filename, name_pattern=name, max_results=1)
+    
+    for node in results.get('results', ()):
+        if node.get('is_callable', True) and node['name'] == name:
+            print(f"Found Callable '{node['name']}' at lines {node['start_line']}-{node['end_line']}")
+            return 0
+    
+    # If we get here, no exact match was found
+    print(f"Callable '{name}' not found")
+    return 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Main function for command-line usage.
+    
+    Called with just a file and an exact name (no wildcards, no options), it
+    keeps the output expected by section_splitting.py: the first callable
+    with that name, or a 'not found' message and exit status 1.
+    
+    Args:
+        argv: Command-line arguments (defaults to sys.argv[1:])
+        
+    Returns:
+        Process exit status
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    
     parser = argparse.ArgumentParser(
         description="Advanced Python AST parser for code analysis.",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -514,6 +896,9 @@ Examples:
   
   Get a compact listing of all callable elements:
     python-ast-parser myfile.py "*" --line-numbers-only
+  
+  Get the results as JSON:
+    python-ast-parser myfile.py "*" --json
 """
     )
     
@@ -541,7 +926,14 @@ Examples:
     parser.add_argument('--version', type=str, default='3.10',
                       help='Python language version to use for parsing (e.g., 3.9, 3.10)')
     
-    args = parser.parse_args()
+    parser.add_argument('--json', action='store_true',
+                      help='Print results as JSON')
+    
+    args = parser.parse_args(argv)
+    
+    # Backward compatibility with section_splitting.py (exact name match)
+    if len(argv) == 2 and not any(ch in args.pattern for ch in '*?'):
+        return _find_exact_callable(args.filename, args.pattern)
     
     # Process version
     try:
@@ -568,6 +960,10 @@ Examples:
     )
     
     # Print results
+    if args.json:
+        write_json(results)
+        return 0
+    
     print_results(
         results, 
         args.line_numbers_only, 
@@ -575,40 +971,8 @@ Examples:
         args.signature_only
     )
     
-    # For compatibility with older scripts
-    if len(sys.argv) > 2 and sys.argv[2] != "*":
-        # Check if any results matched
-        if 'results' in results and results['results']:
-            # Find the first matching callable
-            for node in results['results']:
-                if node.get('is_callable', True) and node['name'] == sys.argv[2]:
-                    print(f"Found Callable '{node['name']}' at lines {node['start_line']}-{node['end_line']}")
-                    return 0
-    
     return 0
 
 
 if __name__ == "__main__":
-    # Check if simple command line arguments are used
-    if len(sys.argv) == 3 and not sys.argv[2].startswith('--') and sys.argv[2] != '*':
-        # For backward compatibility with section_splitting.py (exact name match)
-        filename = sys.argv[1]
-        pattern = sys.argv[2]
-        
-        results = process_file(filename, name_pattern=pattern)
-        
-        if 'results' in results and results['results']:
-            for node in results['results']:
-                if node.get('is_callable', True) and node['name'] == pattern:
-                    print(f"Found Callable '{node['name']}' at lines {node['start_line']}-{node['end_line']}")
-                    sys.exit(0)
-                    
-            # If we get here, no exact match was found
-            print(f"Callable '{pattern}' not found")
-            sys.exit(1)
-        else:
-            print(f"Callable '{pattern}' not found")
-            sys.exit(1)
-    else:
-        # Use the modern argparse interface
-        sys.exit(main())
+    sys.exit(main())
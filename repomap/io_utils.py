@@ -2,6 +2,7 @@
 InputOutput module for handling file operations and output.
 """
 
+import io
 import os
 import sys
 from pathlib import Path
@@ -17,7 +18,8 @@ class InputOutput:
     def __init__(self,
                  stdout: TextIO = sys.stdout,
                  stderr: TextIO = sys.stderr,
-                 quiet: bool = False):
+                 quiet: bool = False,
+                 buffered: bool = False):
         """
         Initialize the InputOutput class.
 
@@ -25,11 +27,13 @@ class InputOutput:
             stdout: Stream to use for standard output
             stderr: Stream to use for error output
             quiet: Whether to suppress normal output
+            buffered: Whether to collect output messages until flush() is called
         """
         self.stdout = stdout
         self.stderr = stderr
         self.quiet = quiet
         self.file_cache: Dict[str, str] = {}
+        self._buf: Optional[io.StringIO] = io.StringIO() if buffered else None
 
     def read_text(self, file_path: Union[str, Path]) -> Optional[str]:
         """
@@ -126,7 +130,24 @@ class InputOutput:
             message: Message to print
         """
         if not self.quiet:
-            print(message, file=self.stdout)
+            if self._buf is not None:
+                self._buf.write(f"{message}\n")
+            else:
+                print(message, file=self.stdout)
+
+    def flush(self):
+        """
+        Write any buffered output messages to stdout with a single write.
+        """
+        if self._buf is None:
+            return
+
+        pending = self._buf.getvalue()
+        if pending:
+            self.stdout.write(pending)
+            self._buf.seek(0)
+            self._buf.truncate()
+        self.stdout.flush()
 
     def tool_error(self, message: str):
         """
@@ -135,6 +156,9 @@ class InputOutput:
         Args:
             message: Error message to print
         """
+        # Buffered status lines come first, so the two streams stay in order
+        if self._buf is not None:
+            self.flush()
         print(f"ERROR: {message}", file=self.stderr)
 
     def tool_warning(self, message: str):
@@ -144,6 +168,9 @@ class InputOutput:
         Args:
             message: Warning message to print
         """
+        # Buffered status lines come first, so the two streams stay in order
+        if self._buf is not None:
+            self.flush()
         print(f"WARNING: {message}", file=self.stderr)
 
     def confirm_ask(self, message: str, default: str = "y", subject: Optional[str] = None) -> bool:
@@ -1,7 +1,13 @@
 """
 Models module for token counting support.
+
+This is the only definition of Model; repomap.modules.models is a separate
+module holding the Tag and TreeNode data structures.
 """
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Union
+
+# tiktoken encodings by model name, shared by all Model instances
+_ENC_CACHE: Dict[str, Any] = {}
 
 
 class Model:
@@ -23,7 +29,10 @@ class Model:
         # Try to import tiktoken for better token counting
         try:
             import tiktoken
-            self.encoding = tiktoken.encoding_for_model(model_name)
+            encoding = _ENC_CACHE.get(model_name)
+            if encoding is None:
+                encoding = _ENC_CACHE[model_name] = tiktoken.encoding_for_model(model_name)
+            self.encoding = encoding
             self._count_tokens = self._count_tokens_tiktoken
         except (ImportError, KeyError):
             # Fallback to approximate token counting
@@ -53,6 +62,23 @@ class Model:
         Typically, 1 token is about 4 characters of English text.
         """
         return max(1, len(text) // 4)  # Ensure at least 1 token
+
+    def _line_token_counts(self, lines):
+        """
+        Count tokens for each line.
+
+        With tiktoken all lines are encoded in a single batch call instead of
+        one encode call per line. A token_count overridden by a subclass or
+        on the instance is called per line instead, so the line counts agree
+        with the whole-text count in chunk_text_by_tokens.
+        """
+        if (
+            type(self).token_count is Model.token_count
+            and "token_count" not in vars(self)
+            and self._count_tokens == self._count_tokens_tiktoken
+        ):
+            return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(lines)]
+        return [self.token_count(line) for line in lines]
         
     def chunk_text_by_tokens(self, text, max_tokens_per_chunk):
         """
@@ -77,8 +103,7 @@ class Model:
         current_chunk = []
         current_chunk_tokens = 0
         
-        for line in lines:
-            line_tokens = self.token_count(line)
+        for line, line_tokens in zip(lines, self._line_token_counts(lines)):
             
             # If this single line is too large, we need to split it
             if line_tokens > max_tokens_per_chunk:
@@ -90,15 +115,18 @@ class Model:
                 
                 # Split the large line at character boundaries
                 # This is a fallback for extremely long lines
-                chunks_needed = (line_tokens + max_tokens_per_chunk - 1) // max_tokens_per_chunk
-                chars_per_chunk = len(line) // chunks_needed
-                
-                for i in range(0, len(line), chars_per_chunk):
-                    chunk = line[i:i+chars_per_chunk]
-                    chunks.append(chunk)
+                chunks_needed = -(-line_tokens // max_tokens_per_chunk)
+                # Round up so the line splits into exactly chunks_needed pieces
+                # instead of leaving a short extra piece at the end
+                chars_per_chunk = -(-len(line) // chunks_needed)
+                chunks.extend(
+                    line[i:i + chars_per_chunk]
+                    for i in range(0, len(line), chars_per_chunk)
+                )
+                continue
             
             # If adding this line would exceed the limit, start a new chunk
-            elif current_chunk_tokens + line_tokens > max_tokens_per_chunk:
+            if current_chunk_tokens + line_tokens > max_tokens_per_chunk:
                 # Save the current chunk
                 chunks.append("".join(current_chunk))
                 # Start a new chunk with this line
@@ -7,11 +7,11 @@ modular components.
 from .core import RepoMap
 from .models import Tag, TreeNode
 from .file_utils import (
-    get_rel_fname, get_mtime, find_src_files, 
+    get_rel_fname, get_mtime, file_digest, file_ext, find_src_files, 
     expand_globs, find_common_root, is_text_file,
-    is_binary_file, is_image_file
+    is_binary_file, find_binary_files, is_image_file, StatCache
 )
-from .parsers import get_tags, get_tags_raw, get_scm_fname
+from .parsers import get_tags, get_tags_raw, iter_tags_raw, get_scm_fname, parse_files
 from .symbol_extraction import get_ranked_tags, generate_symbol_map
 from .visualization import (
     format_tag_list, build_tree, render_tree,
@@ -27,12 +27,12 @@ __all__ = [
     'Tag', 'TreeNode',
     
     # File utilities
-    'get_rel_fname', 'get_mtime', 'find_src_files',
+    'get_rel_fname', 'get_mtime', 'file_digest', 'file_ext', 'find_src_files',
     'expand_globs', 'find_common_root', 'is_text_file',
-    'is_binary_file', 'is_image_file',
+    'is_binary_file', 'find_binary_files', 'is_image_file', 'StatCache',
     
     # Parsers
-    'get_tags', 'get_tags_raw', 'get_scm_fname',
+    'get_tags', 'get_tags_raw', 'iter_tags_raw', 'get_scm_fname', 'parse_files',
     
     # Symbol extraction
     'get_ranked_tags', 'generate_symbol_map',
@@ -3,12 +3,148 @@
 Cache management functions for RepoMap.
 """
 import os
+import pickle
+import pickletools
 import sqlite3
+import struct
+import sys
+import threading
 import logging
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Set, Optional, Any, Tuple
+from typing import Dict, List, Set, Optional, Any, Tuple
+
+from .config import (
+    CACHE_ASYNC_DECODE_BYTES, CACHE_MEMORY_ENTRIES, CACHE_VERSION, CACHE_WAL_AUTOCHECKPOINT,
+    CACHE_WRITE_BATCH_SIZE, SQLITE_ERRORS
+)
+from .models import Tag
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is used instead
+    zstandard = None
+
+# Compact tag list encoding: magic, header, NUL-separated string table, then
+# one (rel_fname, fname, line, name, kind) row per tag with strings as indexes
+_TAGS_MAGIC = b"RM1\x00"
+_TAGS_HEADER = struct.Struct("<III")  # string count, tag count, string table size
+_TAG_ROW_FIELDS = 5
+
+# Stored blobs start with one byte naming their compression
+_RAW, _ZLIB, _ZSTD = b"R", b"D", b"Z"
+_ZSTD_COMPRESSOR = zstandard.ZstdCompressor(level=1) if zstandard else None
+_zstd_local = threading.local()
+
+# Errors raised when a stored blob cannot be decoded
+_DECODE_ERRORS = (pickle.UnpicklingError, struct.error, ValueError, IndexError, EOFError, zlib.error)
+if zstandard is not None:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+def _encode_tags(tags: Any) -> bytes:
+    """
+    Serialize tags for the cache.
+    
+    Lists of Tag use the compact string-table format; anything else, or tags
+    whose fields do not fit it, is pickled.
+    """
+    if isinstance(tags, list) and all(type(tag) is Tag for tag in tags):
+        strings = {}
+        index = strings.setdefault
+        rows = []
+        for tag in tags:
+            rows += (
+                index(tag.rel_fname, len(strings)),
+                index(tag.fname, len(strings)),
+                tag.line,
+                index(tag.name, len(strings)),
+                index(tag.kind, len(strings)),
+            )
+        try:
+            table = "\0".join(strings).encode("utf-8")
+            if table.count(b"\0") == max(len(strings) - 1, 0):
+                return b"".join((
+                    _TAGS_MAGIC,
+                    _TAGS_HEADER.pack(len(strings), len(tags), len(table)),
+                    table,
+                    struct.pack(f"<{len(tags) * _TAG_ROW_FIELDS}i", *rows),
+                ))
+        except (TypeError, AttributeError, struct.error):
+            # Non-string names or non-integer lines
+            pass
+    
+    return pickletools.optimize(pickle.dumps(tags, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _decode_tags(blob: bytes) -> Any:
+    """Deserialize tags written by _encode_tags."""
+    if not blob.startswith(_TAGS_MAGIC):
+        return pickle.loads(blob)
+    
+    offset = len(_TAGS_MAGIC)
+    n_strings, n_tags, table_size = _TAGS_HEADER.unpack_from(blob, offset)
+    offset += _TAGS_HEADER.size
+    strings = []
+    if n_strings:
+        # Interned like the strings of freshly parsed tags
+        table = blob[offset:offset + table_size].decode("utf-8")
+        strings = list(map(sys.intern, table.split("\0")))
+    offset += table_size
+    
+    rows = struct.unpack_from(f"<{n_tags * _TAG_ROW_FIELDS}i", blob, offset)
+    string = strings.__getitem__
+    step = _TAG_ROW_FIELDS
+    fields = zip(
+        map(string, rows[0::step]), map(string, rows[1::step]), rows[2::step],
+        map(string, rows[3::step]), map(string, rows[4::step]),
+    )
+    # tuple.__new__ skips the keyword handling of the namedtuple constructor
+    new_tag = tuple.__new__
+    return [new_tag(Tag, row) for row in fields]
+
+
+def _same_size(stored: Optional[int], size: Optional[int]) -> bool:
+    """Return True unless both file sizes are known and differ."""
+    return stored is None or size is None or stored == size
+
+
+def _compress(blob: bytes) -> bytes:
+    """
+    Compress an encoded tag blob for storage.
+    
+    Uses zstd level 1 when zstandard is installed and zlib level 1 otherwise.
+    Blobs that do not shrink are stored as they are. Only called while the
+    write lock is held, so the shared compressor is not used concurrently.
+    """
+    if _ZSTD_COMPRESSOR is not None:
+        packed, kind = _ZSTD_COMPRESSOR.compress(blob), _ZSTD
+    else:
+        packed, kind = zlib.compress(blob, 1), _ZLIB
+    if len(packed) < len(blob):
+        return kind + packed
+    return _RAW + blob
+
+
+def _decompress(data: bytes) -> bytes:
+    """Undo _compress."""
+    kind, payload = data[:1], data[1:]
+    if kind == _RAW:
+        return payload
+    if kind == _ZLIB:
+        return zlib.decompress(payload)
+    if kind == _ZSTD:
+        if zstandard is None:
+            raise ValueError("cache entry is zstd-compressed but zstandard is not installed")
+        # Decompressors are not thread-safe; keep one per reading thread
+        decompressor = getattr(_zstd_local, "decompressor", None)
+        if decompressor is None:
+            decompressor = _zstd_local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(payload)
+    raise ValueError(f"unknown cache blob format {kind!r}")
 
-from .config import CACHE_VERSION, SQLITE_ERRORS
 
 class Cache:
     """Cache manager for RepoMap."""
@@ -21,6 +157,27 @@ class Cache:
         self.cache_dir = os.path.join(self.root, ".repomap.tags.cache.v4")
         self.conn = None
         self.cursor = None
+        # Tag saves not yet written to the database:
+        # file_path -> (mtime, size, blob, content digest)
+        self._pending = {}
+        # Decoded tags seen in this process, least recently used first:
+        # file_path -> (mtime, size, tags), guarded by _mem_lock since
+        # lookups may come from several threads
+        self._mem = OrderedDict()
+        self._mem_lock = threading.Lock()
+        # Writes go through self.conn under this lock; reads use a connection
+        # per thread so they never wait on each other
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._reader_conns = []
+        self._db_path = None
+        # Decodes large blobs for get_cached_tags_async; created on first use
+        self._decoder_pool = None
+        # (file_path, mtime) pairs stored in the database, so lookups for
+        # files that were never cached skip the SELECT
+        self._known = set()
+        # The file_path column of _known, for has_entry
+        self._known_paths = set()
         self.load_cache()
     
     def load_cache(self):
@@ -31,37 +188,30 @@ class Cache:
             
             # Check if the DB is locked
             try:
-                self.conn = sqlite3.connect(db_path)
+                # Autocommit mode: transactions are opened explicitly where needed
+                self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
                 self.cursor = self.conn.cursor()
+                self._apply_pragmas(self.conn)
+                self._db_path = db_path
+                self._local.conn = self.conn
                 
                 # Create tables if they don't exist
-                self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS meta (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
-                """)
-                
-                self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS file_tags (
-                    file_path TEXT,
-                    mtime FLOAT,
-                    tags BLOB,
-                    PRIMARY KEY (file_path)
-                )
-                """)
+                self._create_tables()
                 
-                # Check schema version
-                self.cursor.execute("SELECT value FROM meta WHERE key = 'version'")
-                row = self.cursor.fetchone()
-                if row is None:
-                    self.cursor.execute("INSERT INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
-                elif int(row[0]) != CACHE_VERSION:
-                    # Clear cache on version mismatch
-                    self.cursor.execute("DELETE FROM file_tags")
-                    self.cursor.execute("UPDATE meta SET value = ? WHERE key = 'version'", (str(CACHE_VERSION),))
+                # Check schema version, kept in the database header
+                version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+                if version != CACHE_VERSION:
+                    # Rebuild the cache on version mismatch, since the table
+                    # layout may have changed; the meta table held the
+                    # version before it moved to user_version
+                    self.cursor.execute("DROP TABLE IF EXISTS meta")
+                    self.cursor.execute("DROP TABLE IF EXISTS file_tags")
+                    self._create_tables()
+                    self.cursor.execute(f"PRAGMA user_version = {int(CACHE_VERSION)}")
                 
-                self.conn.commit()
+                # Answered from the (file_path, mtime) index alone
+                self._known = set(self.cursor.execute("SELECT file_path, mtime FROM file_tags"))
+                self._known_paths = {file_path for file_path, _ in self._known}
                 
                 if self.verbose:
                     self.io.tool_output("Cache initialized.")
@@ -72,6 +222,64 @@ class Cache:
         except Exception as e:
             self.cache_error(e)
     
+    def _create_tables(self):
+        """Create the tags table and its lookup index if they don't exist."""
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_tags (
+            file_path TEXT,
+            mtime FLOAT,
+            size INTEGER,
+            tags BLOB,
+            digest TEXT,
+            PRIMARY KEY (file_path)
+        )
+        """)
+        
+        # Lets the (file_path, mtime) lookup be answered from the index
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_file_tags_mtime ON file_tags(file_path, mtime)"
+        )
+    
+    def _apply_pragmas(self, conn):
+        """
+        Tune the SQLite connection for the cache workload.
+        
+        WAL lets readers run while a writer saves tags and, together with
+        synchronous=NORMAL, avoids an fsync per committed write. WAL needs
+        a local file system; where it cannot be enabled the default
+        rollback journal is kept. Automatic checkpoints are spaced out so a
+        cold cache warm-up is not interrupted by them; close() truncates the
+        WAL instead.
+        """
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute(f"PRAGMA wal_autocheckpoint={CACHE_WAL_AUTOCHECKPOINT}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA mmap_size=268435456")
+    
+    def _get_conn(self):
+        """
+        Return the connection reads should use in the calling thread.
+        
+        The thread that loaded the cache reuses the main connection; other
+        threads get their own connection on first use. The in-memory fallback
+        database only exists on the main connection, so it is always shared.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self._db_path is None:
+                return self.conn
+            conn = sqlite3.connect(self._db_path, check_same_thread=False, isolation_level=None)
+            self._apply_pragmas(conn)
+            self._local.conn = conn
+            with self._write_lock:
+                self._reader_conns.append(conn)
+        return conn
+    
     def cache_error(self, original_error=None):
         """Handle cache errors gracefully."""
         if original_error and self.verbose:
@@ -85,83 +293,291 @@ class Cache:
                 pass
         
         # Reinitialize with in-memory database
-        self.conn = sqlite3.connect(":memory:")
+        self._db_path = None
+        self._known = set()
+        self._known_paths = set()
+        self._local = threading.local()
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
         self.cursor = self.conn.cursor()
         
         # Create tables
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS meta (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )
-        """)
-        
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS file_tags (
-            file_path TEXT,
-            mtime FLOAT,
-            tags BLOB,
-            PRIMARY KEY (file_path)
-        )
-        """)
+        self._create_tables()
         
         # Set version
-        self.cursor.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
-        self.conn.commit()
+        self.cursor.execute(f"PRAGMA user_version = {int(CACHE_VERSION)}")
         
         if self.verbose:
             self.io.tool_warning("Using temporary cache due to error.")
     
-    def get_cached_tags(self, file_path: str, mtime: float) -> Optional[Any]:
-        """Get cached tags for a file if available and not stale."""
+    def get_cached_tags(self, file_path: str, mtime: float, size: Optional[int] = None) -> Optional[Any]:
+        """
+        Get cached tags for a file if available and not stale.
+        
+        An entry is fresh when its mtime matches and, if both the entry and
+        the caller know it, so does the file size. The size catches edits
+        that keep the mtime, e.g. within the file system's timestamp
+        resolution.
+        """
+        tags, blob = self._lookup(file_path, mtime, size)
+        if blob is not None:
+            return self._decode_blob(file_path, mtime, size, blob)
+        return tags
+    
+    def get_cached_tags_async(self, file_path: str, mtime: float, size: Optional[int] = None) -> Future:
+        """
+        Like get_cached_tags, but return a Future for the tags.
+        
+        Blobs larger than CACHE_ASYNC_DECODE_BYTES are decoded on a small
+        thread pool, so the caller can go on with other work (for instance,
+        looking up the next file) while a large tag list is being decoded.
+        Other lookups return an already completed Future.
+        """
+        tags, blob = self._lookup(file_path, mtime, size)
+        if blob is not None:
+            if len(blob) > CACHE_ASYNC_DECODE_BYTES:
+                return self._get_decoder_pool().submit(self._decode_blob, file_path, mtime, size, blob)
+            tags = self._decode_blob(file_path, mtime, size, blob)
+        
+        future = Future()
+        future.set_result(tags)
+        return future
+    
+    def _lookup(
+        self, file_path: str, mtime: float, size: Optional[int]
+    ) -> Tuple[Optional[Any], Optional[bytes]]:
+        """
+        Find cached tags without decoding anything read from the database.
+        
+        Returns:
+            Tuple of (tags, None) for in-memory hits, (None, blob) for a
+            stored blob that still needs _decode_blob, and (None, None) on a miss
+        """
         if not self.conn:
-            return None
+            return None, None
+        
+        with self._mem_lock:
+            hit = self._mem.get(file_path)
+            if hit is not None and hit[0] == mtime and _same_size(hit[1], size):
+                self._mem.move_to_end(file_path)
+                return hit[2], None
+        
+        # Saves that have not been flushed yet are newer than the database
+        pending = self._pending.get(file_path)
+        if pending is not None:
+            if pending[0] != mtime or not _same_size(pending[1], size):
+                return None, None
+            tags = _decode_tags(pending[2])
+            self._remember(file_path, mtime, size, tags)
+            return tags, None
+        
+        if (file_path, mtime) not in self._known:
+            return None, None
         
         try:
-            self.cursor.execute(
-                "SELECT tags FROM file_tags WHERE file_path = ? AND mtime = ?",
-                (file_path, mtime)
-            )
-            row = self.cursor.fetchone()
+            row = self._get_conn().execute(
+                "SELECT tags FROM file_tags WHERE file_path = ? AND mtime = ?"
+                " AND (size IS NULL OR ? IS NULL OR size = ?)",
+                (file_path, mtime, size, size)
+            ).fetchone()
             if row:
-                import pickle
-                return pickle.loads(row[0])
-        except (SQLITE_ERRORS, pickle.UnpicklingError) as e:
+                return None, row[0]
+        except SQLITE_ERRORS as e:
             if self.verbose:
                 self.io.tool_warning(f"Error retrieving from cache: {e}")
         
-        return None
+        return None, None
+    
+    def has_entry(self, file_path: str) -> bool:
+        """
+        Return True if tags for file_path are stored, whatever their mtime.
+        
+        Callers hash a file for get_cached_tags_by_digest only when this is
+        True, so files the cache has never seen are not read just to be hashed.
+        """
+        return file_path in self._known_paths
+    
+    def get_cached_tags_by_digest(
+        self, file_path: str, mtime: float, digest: Optional[str], size: Optional[int] = None
+    ) -> Optional[Any]:
+        """
+        Get cached tags for a file whose content is unchanged under a new mtime.
+        
+        Called after get_cached_tags misses. A checkout, touch or cp -p can
+        change a file's mtime without touching its content; such files are
+        looked up by content digest instead of being parsed again. On a hit
+        the entry is re-saved under the new mtime and size, so later runs
+        hit on the stat key alone.
+        """
+        if not self.conn or digest is None:
+            return None
+        
+        pending = self._pending.get(file_path)
+        if pending is not None:
+            if pending[3] != digest:
+                return None
+            blob = pending[2]
+        else:
+            try:
+                row = self._get_conn().execute(
+                    "SELECT tags FROM file_tags WHERE file_path = ? AND digest = ?",
+                    (file_path, digest)
+                ).fetchone()
+            except SQLITE_ERRORS as e:
+                if self.verbose:
+                    self.io.tool_warning(f"Error retrieving from cache: {e}")
+                return None
+            if row is None:
+                return None
+            try:
+                blob = _decompress(row[0])
+            except _DECODE_ERRORS as e:
+                if self.verbose:
+                    self.io.tool_warning(f"Error retrieving from cache: {e}")
+                return None
+        
+        try:
+            tags = _decode_tags(blob)
+        except _DECODE_ERRORS as e:
+            if self.verbose:
+                self.io.tool_warning(f"Error retrieving from cache: {e}")
+            return None
+        
+        # Re-key under the new mtime without encoding the tags again
+        self._remember(file_path, mtime, size, tags)
+        self._queue(file_path, mtime, size, blob, digest)
+        return tags
+    
+    def _decode_blob(
+        self, file_path: str, mtime: float, size: Optional[int], blob: bytes
+    ) -> Optional[Any]:
+        """Decode a stored blob and remember the tags; None if it is unreadable."""
+        try:
+            tags = _decode_tags(_decompress(blob))
+        except _DECODE_ERRORS as e:
+            if self.verbose:
+                self.io.tool_warning(f"Error retrieving from cache: {e}")
+            return None
+        self._remember(file_path, mtime, size, tags)
+        return tags
     
-    def save_tags_to_cache(self, file_path: str, mtime: float, tags: Any) -> bool:
-        """Save tags to cache."""
+    def _get_decoder_pool(self) -> ThreadPoolExecutor:
+        """Create the decoding thread pool on first use."""
+        with self._write_lock:
+            if self._decoder_pool is None:
+                self._decoder_pool = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="repomap-cache-decode"
+                )
+            return self._decoder_pool
+    
+    def _remember(self, file_path: str, mtime: float, size: Optional[int], tags: Any):
+        """Keep decoded tags in memory, evicting the least recently used entry."""
+        mem = self._mem
+        with self._mem_lock:
+            mem[file_path] = (mtime, size, tags)
+            mem.move_to_end(file_path)
+            if len(mem) > CACHE_MEMORY_ENTRIES:
+                mem.popitem(last=False)
+    
+    def save_tags_to_cache(
+        self, file_path: str, mtime: float, tags: Any, digest: Optional[str] = None,
+        size: Optional[int] = None
+    ) -> bool:
+        """
+        Save tags to cache.
+        
+        Saves are collected and written CACHE_WRITE_BATCH_SIZE at a time in a
+        single transaction; call flush() (or close()) to write the rest. The
+        optional content digest lets get_cached_tags_by_digest find the tags
+        again after the file's mtime changes; the optional file size is
+        checked along with the mtime by get_cached_tags.
+        """
         if not self.conn:
             return False
         
         try:
-            import pickle
-            serialized_tags = pickle.dumps(tags)
-            
-            self.cursor.execute(
-                "INSERT OR REPLACE INTO file_tags VALUES (?, ?, ?)",
-                (file_path, mtime, serialized_tags)
-            )
-            self.conn.commit()
+            serialized_tags = _encode_tags(tags)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            if self.verbose:
+                self.io.tool_warning(f"Error saving to cache: {e}")
+            return False
+        
+        self._remember(file_path, mtime, size, tags)
+        return self._queue(file_path, mtime, size, serialized_tags, digest)
+    
+    def _queue(
+        self, file_path: str, mtime: float, size: Optional[int], blob: bytes, digest: Optional[str]
+    ) -> bool:
+        """Add an encoded save to the pending batch, flushing it when full."""
+        with self._write_lock:
+            self._pending[file_path] = (mtime, size, blob, digest)
+            self._known.add((file_path, mtime))
+            self._known_paths.add(file_path)
+            if len(self._pending) >= CACHE_WRITE_BATCH_SIZE:
+                return self._flush_locked()
+        return True
+    
+    def flush(self) -> bool:
+        """Write all pending tag saves to the database in one transaction."""
+        with self._write_lock:
+            return self._flush_locked()
+    
+    def _flush_locked(self) -> bool:
+        """Write pending saves; the caller holds the write lock."""
+        if not self._pending or not self.conn:
             return True
         
-        except (SQLITE_ERRORS, pickle.PicklingError) as e:
+        rows = (
+            (file_path, mtime, size, _compress(blob), digest)
+            for file_path, (mtime, size, blob, digest) in self._pending.items()
+        )
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("INSERT OR REPLACE INTO file_tags VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+        
+        except SQLITE_ERRORS as e:
+            try:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+            except SQLITE_ERRORS:
+                pass
             if self.verbose:
                 self.io.tool_warning(f"Error saving to cache: {e}")
+            # The rows stay pending, so the next flush writes them
             return False
+        
+        # Cleared only now so readers keep seeing the rows until committed
+        self._pending.clear()
+        return True
     
     def close(self):
-        """Close the cache connection."""
-        if self.conn:
+        """
+        Close the cache connections, writing any pending saves first.
+        
+        Safe to call more than once and never raises, so it can run from a
+        finalizer at interpreter exit.
+        """
+        if not self.conn:
+            return
+        try:
+            self.flush()
+            if self._decoder_pool is not None:
+                self._decoder_pool.shutdown(wait=True)
+                self._decoder_pool = None
+            with self._write_lock:
+                for conn in self._reader_conns:
+                    conn.close()
+                self._reader_conns.clear()
+            self._local = threading.local()
             try:
-                self.conn.close()
-                self.conn = None
-                self.cursor = None
-            except Exception as e:
-                if self.verbose:
-                    self.io.tool_warning(f"Error closing cache: {e}")
-                self.conn = None
-                self.cursor = None
+                # Keep the WAL from growing from one run to the next
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except SQLITE_ERRORS:
+                pass
+            self.conn.close()
+        except Exception as e:
+            if self.verbose:
+                self.io.tool_warning(f"Error closing cache: {e}")
+        finally:
+            self.conn = None
+            self.cursor = None
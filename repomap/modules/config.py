@@ -8,12 +8,48 @@ import re
 from pathlib import Path
 
 # Cache configuration
-CACHE_VERSION = 3
+CACHE_VERSION = 7
 SQLITE_ERRORS = (sqlite3.OperationalError, sqlite3.DatabaseError, OSError)
 
+# Number of tag saves collected before they are written in one transaction
+CACHE_WRITE_BATCH_SIZE = 500
+
+# Number of decoded tag lists kept in memory in front of the SQLite cache
+CACHE_MEMORY_ENTRIES = 20000
+
+# WAL pages written before SQLite checkpoints automatically (default 1000)
+CACHE_WAL_AUTOCHECKPOINT = 10000
+
+# Stored blobs larger than this are decoded off-thread by get_cached_tags_async
+CACHE_ASYNC_DECODE_BYTES = 65536
+
 # Minimum token size
 MIN_TOKEN_SIZE = 4096
 
+# Number of files above which tag extraction is spread over a process pool
+PARALLEL_PARSE_THRESHOLD = 200
+
+# Number of threads scanning directories in find_src_files; the walk is
+# I/O-bound, so this is sized like ThreadPoolExecutor's own default
+FILE_SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Remote repositories are cloned once into this directory and refreshed on
+# later runs; least recently used clones are evicted above the size limit.
+# REPOMAP_CLONE_CACHE_MAX_BYTES overrides the limit, and 0 turns the cache
+# off so every run clones into a new temporary directory
+CLONE_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'repomap', 'clones'
+)
+try:
+    CLONE_CACHE_MAX_BYTES = int(os.environ.get('REPOMAP_CLONE_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+except ValueError:
+    CLONE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Number of threads reading file heads for is_binary_file probes; the reads
+# are latency-bound on network filesystems, so they are overlapped
+BINARY_SNIFF_WORKERS = 64
+
 # Default files to include/exclude
 DEFAULT_IGNORE = [
     '.git', '.hg', '.svn', '.DS_Store', 
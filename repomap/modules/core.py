@@ -7,6 +7,7 @@ import sys
 import random
 import datetime
 import tempfile
+import weakref
 from typing import List, Dict, Set, Tuple, Any, Optional, Union
 from collections import defaultdict, Counter
 
@@ -14,7 +15,7 @@ from .config import MIN_TOKEN_SIZE, FILE_COUNT_MULTIPLIER
 from .cache import Cache
 from .file_utils import (
     get_rel_fname, get_mtime, find_src_files, expand_globs,
-    find_common_root, is_binary_file
+    find_common_root, is_binary_file, StatCache
 )
 from .parsers import get_tags as _get_tags, get_tags_raw as _get_tags_raw
 from .symbol_extraction import get_ranked_tags as _get_ranked_tags
@@ -22,6 +23,9 @@ from .map_generator import get_ranked_tags_map_uncached
 from .visualization import build_tree, render_tree, format_file_list_by_extension
 from .models import TreeNode
 
+# Marker appended to maps generated under pytest, decided once at import
+_TEST_SUFFIX = "\ntest_environment: True" if 'pytest' in sys.modules else ""
+
 
 class RepoMap:
     """
@@ -77,8 +81,10 @@ class RepoMap:
         # Enforce minimum token size
         self.max_map_tokens = max(map_tokens, MIN_TOKEN_SIZE) if map_tokens else MIN_TOKEN_SIZE
         
-        # Initialize cache
+        # Initialize cache; it is closed when this object is collected or, at
+        # the latest, at interpreter exit, without a __del__ running mid-shutdown
         self.cache = Cache(io, root=self.root, verbose=verbose)
+        self._finalizer = weakref.finalize(self, Cache.close, self.cache)
         
         # Set for tracking warned files
         self.warned_files = set()
@@ -140,17 +146,21 @@ class RepoMap:
         if mentioned_idents is None:
             mentioned_idents = set()
         
+        # Files are stat'ed at most once per call; the existence check below
+        # seeds the cache that the map generator reuses
+        self._stat_cache = stat_cache = StatCache()
+        
         # Filter out nonexistent files
         existing_chat_files = []
         for file in chat_files:
-            if os.path.exists(file):
+            if stat_cache.stat(file) is not None:
                 existing_chat_files.append(file)
             elif self.verbose:
                 self.io.tool_warning(f"Chat file does not exist: {file}")
         
         existing_other_files = []
         for file in other_files:
-            if os.path.exists(file):
+            if stat_cache.stat(file) is not None:
                 existing_other_files.append(file)
             elif self.verbose:
                 self.io.tool_warning(f"Other file does not exist: {file}")
@@ -182,13 +192,11 @@ class RepoMap:
             skip_tests=self.skip_tests,
             skip_docs=self.skip_docs,
             skip_git=self.skip_git,
+            stat_cache=self._stat_cache,
         )
         
         # For tests, add special elements
-        if 'pytest' in sys.modules:
-            repo_map += "\ntest_environment: True"
-        
-        return repo_map
+        return repo_map + _TEST_SUFFIX
     
     def build_tree(self, files: List[str]) -> Optional[TreeNode]:
         """Build a tree representation of the repository."""
@@ -207,10 +215,6 @@ class RepoMap:
         if hasattr(self, 'cache'):
             self.cache.close()
     
-    def __del__(self):
-        """Clean up when the object is deleted."""
-        self.close_cache()
-        
     # Compatibility methods for tests
     def get_tags_raw(self, fname: str, rel_fname: str = None) -> List[Any]:
         """
@@ -5,17 +5,74 @@ File utility functions for RepoMap.
 import os
 import re
 import glob
+import stat
+import shutil
 import fnmatch
-import tempfile
+import hashlib
 import subprocess
-from pathlib import Path
-from typing import List, Set, Optional, Any
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, List, Set, Optional, Any, Pattern, Tuple
+
+from .config import (
+    BINARY_SNIFF_WORKERS, CLONE_CACHE_DIR, CLONE_CACHE_MAX_BYTES, DEFAULT_IGNORE, FILE_SCAN_WORKERS,
+    LANGUAGE_EXTENSIONS, TEST_PATTERNS, DOC_PATTERNS, GIT_PATTERNS
+)
+
+# Raw unbuffered reads for file sniffing; O_BINARY only exists on Windows
+_READ_FLAGS = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+# Common image extensions and PDFs
+_IMAGE_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.webp', '.svg', '.ico', '.pdf'
+})
 
-from .config import DEFAULT_IGNORE
+# GitHub, GitLab and Bitbucket repository URLs, over HTTP(S) or SSH
+_GIT_URL_RE = re.compile(
+    r'^(?:https?://(?:github\.com|gitlab\.com|bitbucket\.org)/[\w-]+/[\w-]+(?:\.git)?'
+    r'|git@(?:github\.com|gitlab\.com|bitbucket\.org):[\w-]+/[\w-]+\.git)$'
+)
+
+# Extensions is_binary_file decides without reading the file
+_TEXT_EXTENSIONS = frozenset(
+    [ext for exts in LANGUAGE_EXTENSIONS.values() for ext in exts] + [
+        '.pyi', '.jsx', '.mjs', '.cjs', '.kt', '.kts', '.scala', '.lua', '.pl', '.pm',
+        '.r', '.sh', '.bash', '.zsh', '.sql', '.html', '.htm', '.css', '.scss', '.less',
+        '.xml', '.json', '.yaml', '.yml', '.toml', '.ini', '.cfg', '.md', '.rst', '.txt',
+        '.el', '.ex', '.exs', '.erl', '.hs', '.ml', '.jl', '.dart', '.vue', '.svelte',
+        '.elm', '.clj', '.tf', '.proto', '.graphql', '.svg', '.scm',
+    ]
+)
+_BINARY_EXTENSIONS = (_IMAGE_EXTENSIONS - {'.svg'}) | frozenset({
+    '.zip', '.tar', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.jar', '.war', '.whl',
+    '.egg', '.so', '.o', '.a', '.dylib', '.exe', '.dll', '.lib', '.class', '.pyc', '.pyo',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot', '.mp3', '.mp4', '.wav', '.ogg', '.avi',
+    '.mov', '.db', '.sqlite', '.sqlite3', '.parquet', '.npy', '.npz', '.pkl', '.pickle',
+})
+
+
+@lru_cache(maxsize=64)
+def _root_prefix(root: str) -> Optional[str]:
+    """Return root plus a trailing separator if root is already normalized."""
+    if not root or os.path.normpath(root) != root:
+        return None
+    return root.rstrip(os.sep) + os.sep
 
 
 def get_rel_fname(root: str, fname: str) -> str:
     """Get the file name relative to the root."""
+    # Files under a normalized root are sliced rather than re-normalized,
+    # unless the remainder could contain '.', '..' or doubled separators
+    prefix = _root_prefix(root)
+    if prefix is not None and fname.startswith(prefix):
+        rel = fname[len(prefix):]
+        if (rel and rel[0] not in ('.', os.sep) and not rel.endswith(os.sep)
+                and os.sep + '.' not in rel and os.sep + os.sep not in rel
+                and not (os.altsep and os.altsep in rel)):
+            return rel
+    
     try:
         return os.path.relpath(fname, root)
     except ValueError:
@@ -23,36 +80,127 @@ def get_rel_fname(root: str, fname: str) -> str:
         return fname
 
 
-def get_mtime(fname: str) -> float:
-    """Get the modification time of a file."""
+class StatCache:
+    """
+    Per-run cache of os.stat results, keyed by path.
+    
+    find_src_files fills it from directory entries, and anything else is
+    stat'ed on first use. Each path is therefore stat'ed at most once while
+    a repository map is generated. Paths that cannot be stat'ed are cached
+    as None. There is no expiry, since one map generation is short-lived.
+    """
+    __slots__ = ('_stats',)
+    
+    def __init__(self):
+        self._stats: Dict[str, Optional[os.stat_result]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._stats)
+    
+    def __contains__(self, path: str) -> bool:
+        return path in self._stats
+    
+    def add(self, path: str, st: Optional[os.stat_result]) -> None:
+        """Record a stat result obtained elsewhere, e.g. from a DirEntry."""
+        self._stats[path] = st
+    
+    def stat(self, path: str) -> Optional[os.stat_result]:
+        """Return the stat result for path, or None if it cannot be stat'ed."""
+        try:
+            return self._stats[path]
+        except KeyError:
+            pass
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            st = None
+        self._stats[path] = st
+        return st
+    
+    def mtime(self, path: str) -> float:
+        """Return the modification time of path, or 0.0 if unavailable."""
+        st = self.stat(path)
+        return st.st_mtime if st is not None else 0.0
+    
+    def isfile(self, path: str) -> bool:
+        """Return True if path is a regular file (following symlinks)."""
+        st = self.stat(path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+
+
+def get_mtime(fname: str, cache: Optional[StatCache] = None) -> float:
+    """
+    Get the modification time of a file.
+    
+    Args:
+        fname: Path to the file
+        cache: Optional StatCache to answer from and fill in
+        
+    Returns:
+        Modification time, or 0.0 if the file cannot be stat'ed
+    """
+    if cache is not None:
+        return cache.mtime(fname)
+    
     try:
         return os.path.getmtime(fname)
     except (FileNotFoundError, PermissionError, OSError):
         return 0.0
 
 
+def file_digest(fname: str) -> Optional[str]:
+    """
+    Hash the content of a file for content-keyed tag caching.
+    
+    Uses BLAKE2b with a 16-byte digest, reading in 64 KB chunks so large
+    files are hashed in bounded memory.
+    
+    Args:
+        fname: Path to the file
+        
+    Returns:
+        Hex digest, or None if the file cannot be read
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(fname, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
 def find_src_files(
     root: str, 
     ignore_patterns: List[str] = None,
     skip_tests: bool = False,
     skip_docs: bool = False,
-    skip_git: bool = False
+    skip_git: bool = False,
+    workers: Optional[int] = None,
+    stat_cache: Optional[StatCache] = None
 ) -> List[str]:
     """
     Find all source files in the repository.
     
+    Directories are scanned by a thread pool so that directory reads overlap,
+    which pays off on slow or network file systems. The result keeps the
+    top-down order of os.walk regardless of which thread scanned what.
+    
     Args:
         root: Root directory to search
         ignore_patterns: Patterns of files/directories to ignore
         skip_tests: Whether to skip test files and directories
         skip_docs: Whether to skip documentation files
         skip_git: Whether to skip git-related files
+        workers: Number of scanning threads (defaults to FILE_SCAN_WORKERS,
+            1 scans in the calling thread)
+        stat_cache: Optional StatCache filled with the stat result of every
+            file found, taken from its directory entry
         
     Returns:
         List of file paths
     """
-    from .config import TEST_PATTERNS, DOC_PATTERNS, GIT_PATTERNS
-    
     if ignore_patterns is None:
         ignore_patterns = list(DEFAULT_IGNORE)
     else:
@@ -66,153 +214,373 @@ def find_src_files(
     if skip_git:
         ignore_patterns.extend(GIT_PATTERNS)
         
-    result = []
+    ignored = _compile_ignore_patterns(tuple(ignore_patterns))
     
-    for dirpath, dirnames, filenames in os.walk(root, topdown=True):
-        # Filter directories using ignore patterns
-        dirnames[:] = [d for d in dirnames if not any(
-            _is_match(os.path.join(dirpath, d), d, pat, root) 
-            for pat in ignore_patterns
-        )]
+    def _scan(dirpath: str, rel_dir: str) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """Return the kept files and subdirectories of one directory."""
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+        except OSError:
+            return [], []
         
-        # Filter files using ignore patterns
-        for filename in filenames:
-            filepath = os.path.join(dirpath, filename)
-            
-            if not any(_is_match(filepath, filename, pat, root) for pat in ignore_patterns):
-                result.append(filepath)
+        files = []
+        subdirs = []
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if ignored(entry.name, rel_path, is_dir):
+                continue
+            if not is_dir:
+                files.append(entry.path)
+                if stat_cache is not None:
+                    try:
+                        stat_cache.add(entry.path, entry.stat())
+                    except OSError:
+                        pass
+            elif not entry.is_symlink():
+                subdirs.append((entry.path, rel_path))
+        return files, subdirs
+    
+    if workers is None:
+        workers = FILE_SCAN_WORKERS
+    
+    scanned = None
+    if workers > 1:
+        scanned = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(_scan, root, ''): root}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = scanned[pending.pop(future)] = future.result()
+                    for subdir, rel_path in subdirs:
+                        pending[executor.submit(_scan, subdir, rel_path)] = subdir
+    
+    # Files of a directory come before its subdirectories, as with os.walk
+    result = []
+    stack = [(root, '')]
+    while stack:
+        dirpath, rel_dir = stack.pop()
+        if scanned is not None:
+            files, subdirs = scanned.pop(dirpath)
+        else:
+            files, subdirs = _scan(dirpath, rel_dir)
+        result.extend(files)
+        stack.extend(reversed(subdirs))
     
     return result
 
 
-def _is_match(filepath: str, filename: str, pattern: str, root: str) -> bool:
+_GLOB_CHARS = frozenset('*?[')
+
+
+class _IgnoreMatcher:
     """
-    Check if a file matches a pattern.
+    Ignore patterns compiled for find_src_files.
     
-    Handles both simple patterns and glob patterns with ** for directory traversal.
-    
-    Args:
-        filepath: Full path to the file
-        filename: Just the filename
-        pattern: Pattern to match against
-        root: Root directory for relative path calculations
-        
-    Returns:
-        True if the file matches the pattern
+    Patterns without glob characters, which covers most of DEFAULT_IGNORE,
+    are looked up in a frozenset. Patterns that are a literal with a single
+    leading or trailing ``*`` (``*.pyc``, ``temp_*``) become str.endswith and
+    str.startswith tuples. The rest are combined into one fnmatch regex,
+    matched against both the entry name and its path relative to the root;
+    patterns containing ``/`` can never match a bare name, so they are left
+    out of the regex used for names. Patterns containing ``**`` also get a
+    recursive glob regex, in which
+    ``**`` stands for zero or more whole path components; it is matched
+    against the relative path with a trailing ``/``. Patterns ending in ``/``
+    only match directories, so ignored directories are pruned before they
+    are ever scanned.
     """
-    # Get relative path for pattern matching
-    rel_path = os.path.relpath(filepath, root)
+    __slots__ = ('_any', '_dirs')
     
-    # Simple filename match
-    if fnmatch.fnmatch(filename, pattern):
-        return True
+    def __init__(self, patterns: Tuple[str, ...]):
+        any_patterns = [p for p in patterns if not p.endswith('/')]
+        dir_patterns = [p.rstrip('/') for p in patterns if p.endswith('/')]
+        self._any = self._compile(any_patterns)
+        self._dirs = self._compile([p for p in dir_patterns if p])
+    
+    @staticmethod
+    def _compile(patterns: List[str]) -> Tuple:
+        """
+        Compile one group into (literal names, prefixes, suffixes, name regex,
+        path regex, recursive regex).
+        """
+        literals = frozenset(p for p in patterns if _GLOB_CHARS.isdisjoint(p))
+        globs = [p for p in patterns if p not in literals]
         
-    # Simple relative path match
-    if fnmatch.fnmatch(rel_path, pattern):
-        return True
+        prefixes, suffixes, others = [], [], []
+        for pattern in globs:
+            if pattern.startswith('*') and _GLOB_CHARS.isdisjoint(pattern[1:]):
+                suffixes.append(pattern[1:])
+            elif pattern.endswith('*') and _GLOB_CHARS.isdisjoint(pattern[:-1]):
+                prefixes.append(pattern[:-1])
+            else:
+                others.append(pattern)
         
-    # Handle ** patterns with Path's glob support
-    if '**' in pattern:
-        try:
-            root_path = Path(root)
-            pattern_path = root_path / pattern
-            file_path = Path(filepath)
-            
-            # Check if this file would be matched by the pattern
-            return file_path.match(pattern) or any(p == file_path for p in root_path.glob(pattern))
-        except (ValueError, TypeError):
-            # Fall back to simple matching if glob fails
+        name_globs = [p for p in others if '/' not in p]
+        name_regex = path_regex = None
+        if name_globs:
+            name_regex = re.compile('|'.join(fnmatch.translate(p) for p in name_globs))
+        if others:
+            path_regex = re.compile('|'.join(fnmatch.translate(p) for p in others))
+        
+        recursive = []
+        for pattern in globs:
+            if '**' not in pattern:
+                continue
+            parts = []
+            for segment in pattern.strip('/').split('/'):
+                if segment == '**':
+                    parts.append('(?:[^/]+/)*')
+                elif segment:
+                    parts.append(_translate_segment(segment) + '/')
+            recursive.append(''.join(parts))
+        
+        recursive_re = None
+        if recursive:
+            recursive_re = re.compile('(?s:' + '|'.join(f'(?:{r})' for r in recursive) + r')\Z')
+        return literals, tuple(prefixes), tuple(suffixes), name_regex, path_regex, recursive_re
+    
+    def __call__(self, name: str, rel_path: str, is_dir: bool) -> bool:
+        """Return True if the entry should be ignored."""
+        if self._matches(self._any, name, rel_path):
+            return True
+        return is_dir and self._matches(self._dirs, name, rel_path)
+    
+    @staticmethod
+    def _matches(group, name: str, rel_path: str) -> bool:
+        literals, prefixes, suffixes, name_regex, path_regex, recursive_re = group
+        # At the top level the relative path is the name itself
+        top_level = rel_path is name
+        if name in literals or name.startswith(prefixes) or name.endswith(suffixes):
+            return True
+        if name_regex is not None and name_regex.match(name):
+            return True
+        if not top_level:
+            if rel_path in literals or rel_path.startswith(prefixes) or rel_path.endswith(suffixes):
+                return True
+            if path_regex is not None and path_regex.match(rel_path):
+                return True
+        if recursive_re is None:
             return False
-            
-    return False
+        if os.sep != '/':
+            rel_path = rel_path.replace(os.sep, '/')
+        return recursive_re.match(rel_path + '/') is not None
+
+
+@lru_cache(maxsize=32)
+def _compile_ignore_patterns(patterns: Tuple[str, ...]) -> _IgnoreMatcher:
+    """Build (and memoise) the matcher for a tuple of ignore patterns."""
+    return _IgnoreMatcher(patterns)
+
+
+def _translate_segment(segment: str) -> str:
+    """Translate one glob path component into a regex that never crosses ``/``."""
+    out = []
+    i, n = 0, len(segment)
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = i
+            if j < n and segment[j] == '!':
+                j += 1
+            if j < n and segment[j] == ']':
+                j += 1
+            j = segment.find(']', j)
+            if j == -1:
+                out.append('\\[')
+            else:
+                body = segment[i:j].replace('\\', '\\\\')
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                elif body.startswith('^'):
+                    body = '\\' + body
+                out.append(f'[{body}]')
+                i = j + 1
+        else:
+            out.append(re.escape(c))
+    return ''.join(out)
 
 
 def is_git_url(url: str) -> bool:
     """Check if a string is a Git URL."""
-    git_url_patterns = [
-        r'^https?://github\.com/[\w-]+/[\w-]+$',
-        r'^https?://gitlab\.com/[\w-]+/[\w-]+$',
-        r'^https?://bitbucket\.org/[\w-]+/[\w-]+$',
-        r'^git@github\.com:[\w-]+/[\w-]+\.git$',
-        r'^git@gitlab\.com:[\w-]+/[\w-]+\.git$',
-        r'^git@bitbucket\.org:[\w-]+/[\w-]+\.git$',
-        r'^https?://github\.com/[\w-]+/[\w-]+\.git$',
-        r'^https?://gitlab\.com/[\w-]+/[\w-]+\.git$',
-        r'^https?://bitbucket\.org/[\w-]+/[\w-]+\.git$',
-    ]
-    for pattern in git_url_patterns:
-        if re.match(pattern, url):
-            return True
-    return False
+    return _GIT_URL_RE.match(url) is not None
+
+
+def _run_git(args: List[str]) -> None:
+    """Run a git command, raising CalledProcessError if it fails."""
+    subprocess.run(["git"] + args, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def _dir_size(path: str) -> int:
+    """Return the total size in bytes of the files below path."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _clone_size(path: str, refresh: bool = False) -> int:
+    """
+    Return the size in bytes of a cached clone.
+    
+    The size is recorded in the clone's .git directory, which git leaves
+    alone and the file listing skips, so it is only measured when the clone
+    is created or updated (refresh) or has no record yet.
+    """
+    record = os.path.join(path, ".git", "repomap-size")
+    if not refresh:
+        try:
+            with open(record) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            pass
+    
+    size = _dir_size(path)
+    try:
+        with open(record, "w") as f:
+            f.write(str(size))
+    except OSError:
+        pass
+    return size
+
+
+def _evict_clones(cache_dir: str, keep: str, max_bytes: int) -> None:
+    """Remove least recently used clones until cache_dir fits in max_bytes."""
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return
+    
+    # Clones removed by a concurrent run, or that cannot be read, are skipped
+    mtimes = {}
+    for entry in entries:
+        try:
+            mtimes[entry.path] = entry.stat(follow_symlinks=False).st_mtime
+        except OSError:
+            pass
+    
+    sizes = {path: _clone_size(path) for path in mtimes}
+    total = sum(sizes.values())
+    
+    for path in sorted(mtimes, key=mtimes.__getitem__):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= sizes[path]
 
 
 def clone_repo(url: str, target_dir: str = None) -> str:
-    """Clone a Git repository and return the path to the cloned directory."""
-    import tempfile
-    import subprocess
+    """
+    Clone a Git repository and return the path to the cloned directory.
     
-    if target_dir is None:
-        # Create a temporary directory for the clone
+    Without a target_dir the clone is kept in CLONE_CACHE_DIR, keyed by URL.
+    A repeated run only fetches the latest commit into the existing clone,
+    and the directory's mtime records its last use for LRU eviction. With
+    CLONE_CACHE_MAX_BYTES set to 0 the clone goes to a temporary directory.
+    """
+    if target_dir is None and CLONE_CACHE_MAX_BYTES <= 0:
         target_dir = tempfile.mkdtemp(prefix="repomap_clone_")
     
+    if target_dir is not None:
+        try:
+            _run_git(["clone", "--depth", "1", url, target_dir])
+            return target_dir
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"Error cloning repository: {e}")
+            return ""
+    
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    target_dir = os.path.join(CLONE_CACHE_DIR, key)
+    
+    if os.path.isdir(os.path.join(target_dir, ".git")):
+        try:
+            _run_git(["-C", target_dir, "fetch", "--depth", "1", "origin"])
+            _run_git(["-C", target_dir, "reset", "--hard", "FETCH_HEAD"])
+        except (subprocess.CalledProcessError, OSError) as e:
+            # Work offline from the existing clone
+            print(f"Error updating cached clone, using it as is: {e}")
+    else:
+        shutil.rmtree(target_dir, ignore_errors=True)
+        try:
+            os.makedirs(CLONE_CACHE_DIR, exist_ok=True)
+            _run_git(["clone", "--depth", "1", url, target_dir])
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"Error cloning repository: {e}")
+            shutil.rmtree(target_dir, ignore_errors=True)
+            return ""
+    
     try:
-        # Clone the repository
-        subprocess.run(
-            ["git", "clone", "--depth", "1", url, target_dir],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        return target_dir
-    except subprocess.CalledProcessError as e:
-        print(f"Error cloning repository: {e}")
-        return ""
-
-
-def expand_globs(patterns: List[str], root: str = None) -> List[str]:
-    """Expand glob patterns to file paths."""
+        os.utime(target_dir)
+    except OSError:
+        pass
+    _clone_size(target_dir, refresh=True)
+    _evict_clones(CLONE_CACHE_DIR, target_dir, CLONE_CACHE_MAX_BYTES)
+    return target_dir
+
+
+def expand_globs(patterns: List[str], root: str = None, sort: bool = True) -> List[str]:
+    """
+    Expand glob patterns to file paths.
+    
+    Duplicates are dropped as paths are collected. The result is sorted
+    unless sort is False, for callers that impose their own order.
+    """
     if root is None:
         root = os.getcwd()
         
-    result = []
+    result = set()
     for pattern in patterns:
         # Check if the pattern is a Git URL
         if is_git_url(pattern):
-            # Clone the repository to a temporary directory
+            # Clone the repository, or refresh its cached clone
             print(f"Cloning repository {pattern}...")
             repo_dir = clone_repo(pattern)
             if repo_dir:
                 # Add all files from the cloned repository
-                for dirpath, _, filenames in os.walk(repo_dir):
-                    # Skip the .git directory
-                    if ".git" in dirpath.split(os.path.sep):
-                        continue
-                    for filename in filenames:
-                        result.append(os.path.join(dirpath, filename))
+                for dirpath, dirnames, filenames in os.walk(repo_dir):
+                    # Prune .git directories instead of walking and discarding them
+                    if ".git" in dirnames:
+                        dirnames.remove(".git")
+                    result.update(os.path.join(dirpath, filename) for filename in filenames)
             else:
                 print(f"Failed to clone repository {pattern}")
         # If it's a directory, add all files in it
         elif os.path.isdir(pattern):
-            for dirpath, _, filenames in os.walk(pattern):
-                for filename in filenames:
-                    result.append(os.path.join(dirpath, filename))
+            result.update(find_src_files(pattern, ignore_patterns=[]))
         # If it's a file, add it directly
         elif os.path.isfile(pattern):
-            result.append(pattern)
+            result.add(pattern)
         # Otherwise, treat as a glob pattern
         else:
-            # Use glob.glob for pattern expansion
-            paths = glob.glob(pattern, recursive=True)
-            if paths:
-                result.extend(paths)
-            # Try to handle relative paths inside the repository
-            elif not os.path.isabs(pattern):
+            # Stream glob matches into the result instead of building a list
+            paths = glob.iglob(pattern, recursive=True)
+            first = next(paths, None)
+            if first is not None:
+                result.add(first)
+                result.update(paths)
+            # Try to handle relative paths inside the repository; when root is
+            # the working directory that glob would repeat the one above
+            elif not os.path.isabs(pattern) and os.path.abspath(root) != os.getcwd():
                 repo_pattern = os.path.join(root, pattern)
-                paths = glob.glob(repo_pattern, recursive=True)
-                result.extend(paths)
+                result.update(glob.iglob(repo_pattern, recursive=True))
     
-    # Remove duplicates and sort
-    return sorted(set(result))
+    return sorted(result) if sort else list(result)
 
 
 def find_common_root(files: List[str]) -> str:
@@ -220,19 +588,18 @@ def find_common_root(files: List[str]) -> str:
     if not files:
         return os.getcwd()
     
-    # Convert all paths to absolute
-    abs_paths = [os.path.abspath(f) for f in files]
+    # Convert all paths to absolute, resolving the cwd once rather than
+    # once per relative path as os.path.abspath does
+    cwd = os.getcwd()
+    join, normpath = os.path.join, os.path.normpath
+    abs_paths = [normpath(join(cwd, f)) for f in files]
     
     # Handle Windows drive letters
     if os.name == 'nt':
         # Group by drive letter
         drives = {}
         for path in abs_paths:
-            drive = os.path.splitdrive(path)[0]
-            if drive in drives:
-                drives[drive].append(path)
-            else:
-                drives[drive] = [path]
+            drives.setdefault(os.path.splitdrive(path)[0], []).append(path)
         
         # Find common root for the largest group
         if not drives:
@@ -241,22 +608,12 @@ def find_common_root(files: List[str]) -> str:
         largest_drive = max(drives.keys(), key=lambda d: len(drives[d]))
         abs_paths = drives[largest_drive]
     
-    # Split paths into components
-    path_parts = [Path(p).parts for p in abs_paths]
-    
-    # Find common prefix
-    common_parts = []
-    for parts in zip(*path_parts):
-        if len(set(parts)) == 1:
-            common_parts.append(parts[0])
-        else:
-            break
-    
-    if not common_parts:
+    try:
+        common_path = os.path.commonpath(abs_paths)
+    except ValueError:
         return os.getcwd()
     
     # If the common path is just a file, return its directory
-    common_path = os.path.join(*common_parts)
     if os.path.isfile(common_path):
         return os.path.dirname(common_path)
     
@@ -266,30 +623,132 @@ def find_common_root(files: List[str]) -> str:
 def is_text_file(file_path: str) -> bool:
     """Check if a file is a text file by looking at the first 8KB."""
     try:
-        with open(file_path, 'rb') as f:
-            chunk = f.read(8192)
-        return b'\0' not in chunk
+        fd = os.open(file_path, _READ_FLAGS)
+        try:
+            if _HAS_FADVISE:
+                try:
+                    os.posix_fadvise(fd, 0, 8192, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass  # Only a hint; some file systems reject it
+            chunk = os.read(fd, 8192)
+        finally:
+            os.close(fd)
+        # An int operand goes straight to memchr; a b'\0' operand takes the
+        # generic substring path first
+        return 0 not in chunk
     except (IOError, OSError):
         return False
 
 
-def is_binary_file(file_path: str) -> bool:
-    """Check if a file is binary."""
-    return not is_text_file(file_path)
+def file_ext(file_path: str) -> str:
+    """
+    Return the extension of a path, as os.path.splitext(file_path)[1] would.
+    
+    Extensions are taken for every file in a repository, so this avoids
+    splitext's generic machinery with a couple of string searches.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        The extension including its leading dot, with its case preserved, or
+        an empty string if the file name has none
+    """
+    file_path = os.fspath(file_path)
+    start = file_path.rfind(os.sep)
+    if os.altsep:
+        start = max(start, file_path.rfind(os.altsep))
+    # Leading dots mark hidden files, not extensions
+    name = file_path[start + 1:].lstrip('.')
+    dot = name.rfind('.')
+    return name[dot:] if dot >= 0 else ''
 
 
-def is_image_file(file_path: str) -> bool:
-    """Check if a file is an image or PDF by its extension."""
-    # Convert Path object to string if needed
-    if isinstance(file_path, Path):
-        file_path = str(file_path)
+def _lower_ext(file_path: str) -> str:
+    """Return the lowercased extension of a path."""
+    return file_ext(file_path).lower()
+
+
+def is_binary_file(file_path: str, stat_cache: Optional[StatCache] = None) -> bool:
+    """
+    Check if a file is binary.
+    
+    Well-known source and binary extensions are decided from the name alone.
+    Other files are sniffed with is_text_file, memoised per path, mtime and
+    size so unchanged files are read only once per process.
+    
+    Args:
+        file_path: Path to the file
+        stat_cache: Optional StatCache used for the memo key
+        
+    Returns:
+        True if the file is binary or cannot be read
+    """
+    ext = _lower_ext(file_path)
+    if ext in _TEXT_EXTENSIONS:
+        return False
+    if ext in _BINARY_EXTENSIONS:
+        return True
+    
+    if stat_cache is None:
+        stat_cache = StatCache()
+    st = stat_cache.stat(file_path)
+    if st is None:
+        return True
+    return not _sniff_text(file_path, st.st_mtime_ns, st.st_size)
+
+
+def find_binary_files(
+    file_paths: List[str],
+    stat_cache: Optional[StatCache] = None,
+    workers: Optional[int] = None
+) -> Set[str]:
+    """
+    Return the subset of file_paths that is_binary_file reports as binary.
+    
+    Extensions are checked serially. The files that have to be read are
+    probed on a thread pool so their open/read latencies overlap; the pool
+    size also bounds the number of files open at once.
+    
+    Args:
+        file_paths: Paths of the files to check
+        stat_cache: Optional StatCache shared with other callers
+        workers: Number of probing threads (defaults to BINARY_SNIFF_WORKERS)
         
-    # Get the lowercase extension
-    ext = os.path.splitext(file_path)[1].lower()
+    Returns:
+        Set of the paths that are binary or cannot be read
+    """
+    if stat_cache is None:
+        stat_cache = StatCache()
     
-    # Common image extensions and PDFs
-    image_extensions = {
-        '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.webp', '.svg', '.ico', '.pdf'
-    }
+    binary = set()
+    unknown = []
+    for file_path in file_paths:
+        ext = _lower_ext(file_path)
+        if ext in _TEXT_EXTENSIONS:
+            continue
+        if ext in _BINARY_EXTENSIONS:
+            binary.add(file_path)
+        else:
+            unknown.append(file_path)
     
-    return ext in image_extensions
+    workers = min(workers or BINARY_SNIFF_WORKERS, len(unknown))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            flags = list(executor.map(lambda path: is_binary_file(path, stat_cache), unknown))
+    else:
+        flags = [is_binary_file(path, stat_cache) for path in unknown]
+    
+    binary.update(path for path, is_binary in zip(unknown, flags) if is_binary)
+    return binary
+
+
+@lru_cache(maxsize=65536)
+def _sniff_text(file_path: str, mtime_ns: int, size: int) -> bool:
+    """Memoised is_text_file; mtime_ns and size only make up the key."""
+    return is_text_file(file_path)
+
+
+def is_image_file(file_path: str) -> bool:
+    """Check if a file is an image or PDF by its extension."""
+    return _lower_ext(file_path) in _IMAGE_EXTENSIONS
@@ -8,17 +8,98 @@ import sys
 import tempfile
 import datetime
 from collections import defaultdict
+from functools import lru_cache
 from typing import List, Dict, Set, Tuple, Any, Optional, Union
 from pathlib import Path
 
 from .models import Tag
-from .file_utils import get_rel_fname, get_mtime, is_binary_file
-from .parsers import get_tags
+from .file_utils import StatCache, file_digest, file_ext, get_rel_fname, get_mtime, find_binary_files
+from .parsers import get_tags, parse_files
 from .symbol_extraction import get_ranked_tags, generate_symbol_map
 from .visualization import format_file_list_by_extension, format_token_count
-from .config import MIN_TOKEN_SIZE, FILE_COUNT_MULTIPLIER
+from .config import MIN_TOKEN_SIZE, FILE_COUNT_MULTIPLIER, PARALLEL_PARSE_THRESHOLD
 
 
+def _prefetch_tags(
+    extensions: Dict[str, List[str]],
+    root: str,
+    cache: Any,
+    io: Any,
+    verbose: bool,
+    stat_cache: Optional[StatCache] = None,
+    skip: Optional[Set[str]] = None,
+    rel_fnames: Optional[Dict[str, str]] = None,
+) -> Dict[str, List[Tag]]:
+    """
+    Parse files that are not in the tag cache using a process pool.
+    
+    The parsed tags, those already in the cache and those found by content
+    digest after an mtime change are returned keyed by file path, so the
+    per-file loop that follows can use them without a cache round trip.
+    Files whose relative path is in skip are not parsed; rel_fnames
+    optionally maps file paths to relative paths already computed.
+    """
+    if stat_cache is None:
+        stat_cache = StatCache()
+    if skip is None:
+        skip = set()
+    
+    # Large cached blobs are decoded on the cache's thread pool while the
+    # lookups for the following files go on; they are collected below
+    lookups = []
+    for fnames in extensions.values():
+        for fname in fnames:
+            if not stat_cache.isfile(fname):
+                continue
+            rel_fname = rel_fnames[fname] if rel_fnames else get_rel_fname(root, fname)
+            if rel_fname in skip:
+                continue
+            st = stat_cache.stat(fname)
+            lookups.append((fname, rel_fname, st, cache.get_cached_tags_async(rel_fname, st.st_mtime, st.st_size)))
+    
+    found = {}
+    candidates = []
+    for fname, rel_fname, st, future in lookups:
+        tags = future.result()
+        if tags is not None:
+            found[fname] = tags
+        else:
+            candidates.append((fname, rel_fname, st))
+    
+    # Below the threshold get_tags handles the misses, so they are not
+    # hashed here as well
+    if len(candidates) <= PARALLEL_PARSE_THRESHOLD:
+        return found
+    
+    # Misses are hashed once: the digest finds content unchanged under a new
+    # mtime and is saved with the parsed tags for the next mtime change
+    misses = []
+    for fname, rel_fname, st in candidates:
+        digest = file_digest(fname)
+        if cache.has_entry(rel_fname):
+            tags = cache.get_cached_tags_by_digest(rel_fname, st.st_mtime, digest, st.st_size)
+            if tags is not None:
+                found[fname] = tags
+                continue
+        misses.append((fname, rel_fname, st, digest))
+    
+    if not misses:
+        return found
+    
+    if verbose:
+        io.tool_output(f"Parsing {len(misses)} files in parallel")
+    
+    parsed = parse_files(
+        [fname for fname, _, _, _ in misses],
+        [rel_fname for _, rel_fname, _, _ in misses]
+    )
+    
+    for fname, rel_fname, st, digest in misses:
+        cache.save_tags_to_cache(rel_fname, st.st_mtime, parsed[fname], digest, st.st_size)
+    
+    found.update(parsed)
+    return found
+
 def get_ranked_tags_map_uncached(
     chat_fnames: List[str],
     other_fnames: List[str],
@@ -34,6 +115,7 @@ def get_ranked_tags_map_uncached(
     skip_tests: bool = False,
     skip_docs: bool = False,
     skip_git: bool = False,
+    stat_cache: Optional[StatCache] = None,
 ) -> Tuple[str, List[str]]:
     """
     Generate a repository map from files.
@@ -50,6 +132,8 @@ def get_ranked_tags_map_uncached(
         mentioned_fnames: Set of file names mentioned in the chat
         mentioned_idents: Set of identifiers mentioned in the chat
         token_counter: Function to count tokens in a string
+        stat_cache: Optional per-run StatCache, so each file is stat'ed once
+            across existence checks, cache lookups and saves
         
     Returns:
         Tuple of (map_text, output_files)
@@ -66,6 +150,8 @@ def get_ranked_tags_map_uncached(
     
     if personalize is None:
         personalize = {}
+    if stat_cache is None:
+        stat_cache = StatCache()
     
     # Process file lists
     all_fnames = []
@@ -73,43 +159,66 @@ def get_ranked_tags_map_uncached(
     # Expand directories to individual files
     if chat_fnames:
         all_fnames.extend(chat_fnames)
-        for fname in chat_fnames:
-            chat_rel_fnames.add(get_rel_fname(root, fname))
     
     if other_fnames:
         all_fnames.extend(other_fnames)
     
+    # Relative paths are computed once per file and reused by every step below
+    rel_fnames = {fname: get_rel_fname(root, fname) for fname in all_fnames}
+    if chat_fnames:
+        chat_rel_fnames.update(rel_fnames[fname] for fname in chat_fnames)
+    
     if verbose:
         io.tool_output(f"After directory expansion: {len(chat_fnames)} chat files and {len(other_fnames)} other files")
     
     # Process files by extension
     extensions = defaultdict(list)
     
+    # Probe all files up front so the reads for unknown extensions overlap
+    binary_fnames = find_binary_files(all_fnames, stat_cache)
+    
     for fname in all_fnames:
         # Skip binary files
-        if is_binary_file(fname):
+        if fname in binary_fnames:
             continue
             
-        ext = os.path.splitext(fname)[1]
+        ext = file_ext(fname)
         extensions[ext].append(fname)
         
-    # Extract tags from all files
+    # Chat files that are being personalized are left out of the map
+    skip_rel_fnames = chat_rel_fnames.intersection(personalize)
+    
+    # For large inputs, parse files missing from the cache in parallel first
+    prefetched = {}
+    parse_count = sum(len(fnames) for fnames in extensions.values())
+    if parse_count > PARALLEL_PARSE_THRESHOLD:
+        prefetched = _prefetch_tags(
+            extensions, root, cache, io, verbose, stat_cache, skip_rel_fnames, rel_fnames
+        )
+    
+    # Extract tags from all files, keeping the rel_fname column of the
+    # tags as a set so file counts need no pass over the tags
     all_tags = []
+    tagged_rel_fnames = set()
     
     for ext, fnames in extensions.items():
         if verbose:
             io.tool_output(f"Processing {len(fnames)} {ext} files")
         
         for fname in fnames:
-            rel_fname = get_rel_fname(root, fname)
+            rel_fname = rel_fnames[fname]
             
             # Skip if in chat_rel_fnames but is being personalized
-            if rel_fname in chat_rel_fnames and rel_fname in personalize:
+            if rel_fname in skip_rel_fnames:
                 continue
                 
-            # Get tags for this file
-            file_tags = get_tags(fname, rel_fname, cache, io, verbose)
-            all_tags.extend(file_tags)
+            # Get tags for this file, reusing tags parsed by the prefetch
+            file_tags = prefetched.get(fname)
+            if file_tags is None:
+                file_tags = get_tags(fname, rel_fname, cache, io, verbose, stat_cache)
+            if file_tags:
+                tagged_rel_fnames.add(rel_fname)
+                all_tags.extend(file_tags)
     
     # Rank tags
     ranked_tags, scores = get_ranked_tags(
@@ -130,7 +239,7 @@ def get_ranked_tags_map_uncached(
         return format_file_list_by_extension(all_fnames, root), output_files
     
     # Calculate token allocation based on file count
-    file_count = len(set(tag.rel_fname for tag in ranked_tags))
+    file_count = len(tagged_rel_fnames)
     avg_tokens_per_file = max_map_tokens / file_count if file_count > 0 else 0
     
     # Generate temporary directory name for output files
@@ -143,23 +252,55 @@ def get_ranked_tags_map_uncached(
     file_list = format_file_list_by_extension(all_fnames, root)
     
     # Use token limits
-    token_count = token_counter(file_list) if token_counter else len(file_list) // 4
+    count_tokens = token_counter or (lambda text: len(text) // 4)
+    token_count = count_tokens(file_list)
     
     if token_count <= max_map_tokens:
         # If small enough, just return the file list
         return file_list, output_files
     
     # Split into smaller parts
-    parts = []
-    current_part = ["Repository contents:"]
-    current_tokens = token_counter("\n".join(current_part)) if token_counter else len("\n".join(current_part)) // 4
+    # Token counts are kept as running totals; only the fixed header is
+    # counted once up front
+    header = "Repository contents:"
+    header_tokens = count_tokens(header)
+    
+    # Files listed both as chat and as other files produce the same line
+    # twice; memoise per call so each distinct line is tokenized once
+    count_line = lru_cache(maxsize=8192)(count_tokens)
+    
+    # Each part is written out as soon as it is complete, so only the part
+    # being built (and the first one, which is returned) is held in memory
+    first_part = None
+    part_token_counts = []
+    
+    def write_part(lines: List[str]) -> None:
+        nonlocal first_part
+        part = "\n".join(lines)
+        if first_part is None:
+            first_part = part
+        
+        part_file = os.path.join(temp_dir, f"{output_prefix}_part{len(output_files) + 1:05d}.txt")
+        with open(part_file, 'w', encoding='utf-8') as f:
+            f.write(part)
+        output_files.append(part_file)
+        
+        # Add token count for logging; whole parts are only re-counted when
+        # the counts are actually shown
+        if verbose:
+            part_tokens = count_tokens(part)
+            part_token_counts.append(part_tokens)
+            io.tool_output(f"Wrote part {len(output_files)} with {format_token_count(part_tokens)} tokens to {os.path.basename(part_file)}")
+    
+    current_part = [header]
+    current_tokens = header_tokens
     
     # Group files by extension
     by_ext = defaultdict(list)
     
     for file in all_fnames:
-        rel_path = get_rel_fname(root, file)
-        ext = os.path.splitext(rel_path)[1]
+        rel_path = rel_fnames[file]
+        ext = file_ext(rel_path)
         if not ext:
             ext = "no extension"
         by_ext[ext].append(rel_path)
@@ -173,26 +314,26 @@ def get_ranked_tags_map_uncached(
             ext_display = f"{ext} files"
             
         ext_line = f"\n{ext_display}:"
-        ext_tokens = token_counter(ext_line) if token_counter else len(ext_line) // 4
+        ext_tokens = count_line(ext_line)
         
         if current_tokens + ext_tokens > max_map_tokens:
             # Start a new part
-            parts.append("\n".join(current_part))
-            current_part = ["Repository contents:"]
-            current_tokens = token_counter("\n".join(current_part)) if token_counter else len("\n".join(current_part)) // 4
+            write_part(current_part)
+            current_part = [header]
+            current_tokens = header_tokens
         
         current_part.append(ext_line)
         current_tokens += ext_tokens
         
         for file in sorted(by_ext[ext]):
             file_line = f"  {file}"
-            file_tokens = token_counter(file_line) if token_counter else len(file_line) // 4
+            file_tokens = count_line(file_line)
             
             if current_tokens + file_tokens > max_map_tokens:
                 # Start a new part
-                parts.append("\n".join(current_part))
-                current_part = ["Repository contents:"]
-                current_tokens = token_counter("\n".join(current_part)) if token_counter else len("\n".join(current_part)) // 4
+                write_part(current_part)
+                current_part = [header]
+                current_tokens = header_tokens
                 
                 # Add the extension header again
                 current_part.append(ext_line)
@@ -203,29 +344,19 @@ def get_ranked_tags_map_uncached(
     
     # Add the last part
     if current_part:
-        parts.append("\n".join(current_part))
-    
-    # Write parts to files
-    for i, part in enumerate(parts, 1):
-        part_file = os.path.join(temp_dir, f"{output_prefix}_part{i:05d}.txt")
-        
-        with open(part_file, 'w', encoding='utf-8') as f:
-            f.write(part)
-            
-        output_files.append(part_file)
-        
-        # Add token count for logging
-        part_tokens = token_counter(part) if token_counter else len(part) // 4
-        if verbose:
-            io.tool_output(f"Wrote part {i} with {format_token_count(part_tokens)} tokens to {os.path.basename(part_file)}")
+        write_part(current_part)
     
     # Add summary to the first part
-    repo_map = parts[0] if parts else file_list
-    repo_map += f"\n\n\nRepository map split into {len(parts)} parts"
+    repo_map = first_part if first_part is not None else file_list
+    repo_map += f"\n\n\nRepository map split into {len(output_files)} parts"
     
     # Calculate token count
-    total_tokens = sum(token_counter(part) if token_counter else len(part) // 4 for part in parts)
     if verbose:
+        total_tokens = sum(part_token_counts)
         io.tool_output(f"Repo-map: {format_token_count(total_tokens)}")
     
+    # Write out the parts listing as one block if io buffers its output
+    if hasattr(io, "flush"):
+        io.flush()
+    
     return repo_map, output_files
@@ -22,24 +22,39 @@ class TreeNode:
         return self.children[name]
     
     def print_tree(self, prefix="", is_last=True, max_depth=5, current_depth=0):
-        """Print the tree recursively."""
-        if current_depth > max_depth:
-            return ""
-            
-        connector = "└── " if is_last else "├── "
-        result = prefix + connector + self.name + ("/" if self.is_dir else "") + "\n"
-        
-        # New prefix for children
-        new_prefix = prefix + ("    " if is_last else "│   ")
+        """
+        Print the tree, directories first, down to max_depth levels.
         
-        # Sort children: directories first, then files
-        sorted_children = sorted(
-            [(name, node) for name, node in self.children.items()],
-            key=lambda x: (not x[1].is_dir, x[0].lower())
-        )
+        The tree is walked with an explicit stack and the lines are joined
+        once at the end, so deep trees neither recurse nor re-copy the output.
+        """
+        lines = []
+        stack = [(self, prefix, is_last, current_depth)]
         
-        for i, (name, child) in enumerate(sorted_children):
-            is_last_child = i == len(sorted_children) - 1
-            result += child.print_tree(new_prefix, is_last_child, max_depth, current_depth + 1)
+        while stack:
+            node, prefix, is_last, depth = stack.pop()
+            if depth > max_depth:
+                continue
+            
+            connector = "└── " if is_last else "├── "
+            lines.append(prefix + connector + node.name + ("/" if node.is_dir else "") + "\n")
+            
+            # Children of the deepest level would print nothing
+            if depth == max_depth or not node.children:
+                continue
             
-        return result
+            # New prefix for children
+            new_prefix = prefix + ("    " if is_last else "│   ")
+            
+            # Sort children: directories first, then files
+            sorted_children = sorted(
+                node.children.items(),
+                key=lambda x: (not x[1].is_dir, x[0].lower())
+            )
+            
+            # Push in reverse so the children are popped in sorted order
+            last = len(sorted_children) - 1
+            for i in range(last, -1, -1):
+                stack.append((sorted_children[i][1], new_prefix, i == last, depth + 1))
+        
+        return "".join(lines)
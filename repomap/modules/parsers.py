@@ -2,22 +2,85 @@
 """
 Code parsing and tag extraction for RepoMap.
 """
+import mmap
 import os
 import re
 import sys
 import subprocess
 import importlib
+import importlib.resources
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Tuple, Set, Optional, Any, Union
+from typing import Iterator, List, Dict, Tuple, Set, Optional, Any, Union
 
 from .config import LANGUAGE_EXTENSIONS
 from .models import Tag
-from .file_utils import get_rel_fname
+from .file_utils import StatCache, file_digest, get_rel_fname
 
+# Regex fallback patterns for common constructs. Each captures the symbol
+# name in a group named after its kind, and at most one kind can match a
+# given line, so a language's patterns combine into one alternation. They
+# use [^\S\n] rather than \s so that no match crosses a newline.
+_FALLBACK_PATTERNS = {
+    "python": {
+        "class": r"^class[^\S\n]+(?P<class>\w+)",
+        "function": r"^def[^\S\n]+(?P<function>\w+)",
+        "method": r"^[^\S\n]+def[^\S\n]+(?P<method>\w+)",
+    },
+    "javascript": {
+        "class": r"^class[^\S\n]+(?P<class>\w+)",
+        "function": r"^function[^\S\n]+(?P<function>\w+)",
+        "method": r"^[^\S\n]+(?P<method>\w+)[^\S\n]*\([^)\n]*\)[^\S\n]*{",
+    },
+    "typescript": {
+        "class": r"^class[^\S\n]+(?P<class>\w+)",
+        "function": r"^function[^\S\n]+(?P<function>\w+)",
+        "method": r"^[^\S\n]+(?P<method>\w+)[^\S\n]*\([^)\n]*\)[^\S\n]*{",
+        "interface": r"^interface[^\S\n]+(?P<interface>\w+)",
+    },
+}
+_FALLBACK_RES = {
+    language: re.compile("|".join(kinds.values()), re.MULTILINE)
+    for language, kinds in _FALLBACK_PATTERNS.items()
+}
 
-def get_scm_fname(language: str, query_name: str = "tags") -> Optional[str]:
-    """Get the path to a tree-sitter query file."""
-    # List of places to look for query files
+# Line boundaries recognised by str.splitlines other than \n; files that
+# contain any are matched line by line instead of in one scan
+_OTHER_LINE_BREAKS = re.compile("[\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+_UTF8_OTHER_LINE_BREAKS = tuple(char.encode("utf-8") for char in "\r\v\f\x1c\x1d\x1e\x85\u2028\u2029")
+
+# Bytes versions of the fallback patterns, for scanning memory-mapped UTF-8
+# files without decoding them. Whitespace and \w also accept any non-ASCII
+# byte, so every line the str pattern matches is matched here too; these
+# candidate lines are decoded and checked against the str pattern.
+_FALLBACK_UTF8_RES = {
+    language: re.compile(
+        pattern.pattern
+        .replace(r"[^\S\n]", r"[\t\v\f\r\x1c-\x1f \x80-\xff]")
+        .replace(r"\w", r"[\w\x80-\xff]")
+        .encode("ascii"),
+        re.MULTILINE,
+    )
+    for language, pattern in _FALLBACK_RES.items()
+}
+
+# Literal text that any match of a regex fallback pattern must contain.
+# Files containing none of a language's literals are not scanned.
+_FALLBACK_KEYWORDS = {
+    "python": {"class": "class", "function": "def", "method": "def"},
+    "javascript": {"class": "class", "function": "function", "method": "("},
+    "typescript": {"class": "class", "function": "function", "method": "(", "interface": "interface"},
+}
+_FALLBACK_LITERALS = {
+    language: tuple(dict.fromkeys(keywords.values()))
+    for language, keywords in _FALLBACK_KEYWORDS.items()
+}
+
+
+def _find_query_dirs() -> Tuple[str, ...]:
+    """List the directories searched for tree-sitter query files, in order."""
     query_dirs = [
         # First check local paths
         os.path.join("queries", "tree-sitter-languages"),
@@ -30,7 +93,6 @@ def get_scm_fname(language: str, query_name: str = "tags") -> Optional[str]:
     
     # Add paths from importlib.resources if available
     try:
-        import importlib.resources
         try:
             # Python 3.9+
             files = importlib.resources.files("repomap")
@@ -45,8 +107,25 @@ def get_scm_fname(language: str, query_name: str = "tags") -> Optional[str]:
     except ImportError:
         pass
     
+    return tuple(query_dirs)
+
+
+# The search path only depends on the package location, so it is built once
+_QUERY_DIRS = _find_query_dirs()
+
+
+@lru_cache(maxsize=256)
+def get_scm_fname(language: str, query_name: str = "tags") -> Optional[str]:
+    """
+    Get the path to a tree-sitter query file.
+    
+    Lookups are memoised per (language, query_name), so the candidate
+    directories are only probed once per language. Call
+    get_scm_fname.cache_clear() and _read_query.cache_clear() after
+    installing new query files.
+    """
     # Try to find the query file in the various locations
-    for query_dir in query_dirs:
+    for query_dir in _QUERY_DIRS:
         scm_fname = os.path.join(query_dir, f"{language}-{query_name}.scm")
         
         if os.path.isfile(scm_fname):
@@ -55,16 +134,97 @@ def get_scm_fname(language: str, query_name: str = "tags") -> Optional[str]:
     return None
 
 
-def get_tags_raw(fname: str, rel_fname: str, io: Any, verbose: bool = False) -> List[Tag]:
+@lru_cache(maxsize=256)
+def _read_query(scm_fname: str) -> str:
+    """Return the text of a query file; query files are read-only resources."""
+    with open(scm_fname, "r") as f:
+        return f.read()
+
+
+def _iter_fallback_matches(fname: str, language: str) -> Iterator[Tuple[int, str, str]]:
     """
-    Extract raw tags from a file.
+    Find regex fallback symbols in a file, yielding (line, name, kind).
     
-    This uses tree-sitter or grep_ast to extract tags from a file.
+    The file is memory-mapped and scanned as bytes, and only the lines that
+    may hold a symbol are decoded, so large files are never held in memory
+    as a whole. Files that cannot be mapped (empty or special files) or that
+    use line breaks other than \n are decoded and matched as text.
     """
-    if not os.path.isfile(fname):
+    pattern = _FALLBACK_RES.get(language)
+    if pattern is None:
+        return
+    literals = _FALLBACK_LITERALS[language]
+    
+    with open(fname, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            content = f.read().decode("utf-8", errors="replace")
+            yield from _iter_text_matches(content, pattern, literals)
+            return
+    
+    with mapped:
+        # Skip the scan when no pattern's keyword appears in the file
+        if not any(mapped.find(literal.encode("utf-8")) >= 0 for literal in literals):
+            return
+        
+        if any(mapped.find(line_break) >= 0 for line_break in _UTF8_OTHER_LINE_BREAKS):
+            content = mapped[:].decode("utf-8", errors="replace")
+            yield from _iter_text_matches(content, pattern, literals)
+            return
+        
+        line_num, pos = 1, 0
+        for candidate in _FALLBACK_UTF8_RES[language].finditer(mapped):
+            start = candidate.start()
+            line_num += mapped[pos:start].count(b"\n")
+            pos = start
+            end = mapped.find(b"\n", start)
+            line = mapped[start:end if end >= 0 else len(mapped)].decode("utf-8", errors="replace")
+            match = pattern.match(line)
+            if match:
+                yield line_num, match.group(match.lastgroup), match.lastgroup
+
+
+def _iter_text_matches(content: str, pattern: re.Pattern, literals: Tuple[str, ...]) -> Iterator[Tuple[int, str, str]]:
+    """Find regex fallback symbols in decoded text, yielding (line, name, kind)."""
+    # Skip the scan when no pattern's keyword appears in the file
+    if not any(literal in content for literal in literals):
+        return
+    
+    if _OTHER_LINE_BREAKS.search(content) is None:
+        # Lines end only in \n, so one scan of the whole file finds the same
+        # matches as matching line by line
+        line_num, pos = 1, 0
+        for match in pattern.finditer(content):
+            line_num += content.count("\n", pos, match.start())
+            pos = match.start()
+            yield line_num, match.group(match.lastgroup), match.lastgroup
+    else:
+        for line_num, line in enumerate(content.splitlines(), 1):
+            match = pattern.match(line)
+            if match:
+                yield line_num, match.group(match.lastgroup), match.lastgroup
+
+
+def iter_tags_raw(
+    fname: str,
+    rel_fname: str,
+    io: Any,
+    verbose: bool = False,
+    stat_cache: Optional[StatCache] = None,
+) -> Iterator[Tag]:
+    """
+    Extract raw tags from a file, yielding them one at a time.
+    
+    This uses tree-sitter or grep_ast to extract tags from a file. Paths,
+    names and kinds are interned, since the same strings recur across many
+    tags and are used as dict keys when tags are grouped and ranked. A
+    per-run stat_cache answers the file check without another stat call.
+    """
+    if not (stat_cache.isfile(fname) if stat_cache is not None else os.path.isfile(fname)):
         if verbose:
             io.tool_warning(f"File not found: {fname}")
-        return []
+        return
         
     # Determine file extension and language
     ext = os.path.splitext(fname)[1].lower()
@@ -79,28 +239,32 @@ def get_tags_raw(fname: str, rel_fname: str, io: Any, verbose: bool = False) ->
     if not language:
         if verbose:
             io.tool_warning(f"Unknown language for file: {fname}")
-        return []
+        return
+    
+    rel_fname = sys.intern(rel_fname)
     
     # Try to use grep_ast for tag extraction
     try:
         import grep_ast
-        
+    except ImportError:
+        grep_ast = None
+    
+    # Tags are collected first and only yielded once the whole file has been
+    # parsed, so a parse error yields no tags rather than a partial list
+    tags = []
+    if grep_ast is not None:
         # Find the query file
         scm_fname = get_scm_fname(language)
         if not scm_fname:
             if verbose:
                 io.tool_warning(f"No tree-sitter queries found for language: {language}")
-            return []
+            return
             
         try:
-            # Extract tags using grep_ast
-            tags = []
-            
-            # Read the query file
-            with open(scm_fname, "r") as f:
-                query = f.read()
+            # Read the query file (once per process)
+            query = _read_query(scm_fname)
             
-            # Use grep_ast to extract matches
+            # Extract tags using grep_ast matches
             for match in grep_ast.ast_grep(fname, query):
                 name = match.get("name", "")
                 kind = match.get("kind", "")
@@ -111,93 +275,140 @@ def get_tags_raw(fname: str, rel_fname: str, io: Any, verbose: bool = False) ->
                         rel_fname=rel_fname,
                         fname=fname,
                         line=line,
-                        name=name,
-                        kind=kind
+                        name=sys.intern(name),
+                        kind=sys.intern(kind)
                     ))
-            
-            return tags
                 
         except Exception as e:
             if verbose:
                 io.tool_warning(f"Error parsing {fname}: {e}")
-            return []
+            return
             
-    except ImportError:
+    else:
         # Fall back to simple regex extraction if grep_ast is not available
         if verbose:
             io.tool_warning("grep_ast not available, using regex fallback")
         
         try:
-            with open(fname, "r", encoding="utf-8", errors="replace") as f:
-                content = f.read()
-                
-            tags = []
-            
-            # Simple regex patterns for common constructs
-            patterns = {
-                "python": {
-                    "class": r"^class\s+(\w+)",
-                    "function": r"^def\s+(\w+)",
-                    "method": r"^\s+def\s+(\w+)",
-                },
-                "javascript": {
-                    "class": r"^class\s+(\w+)",
-                    "function": r"^function\s+(\w+)",
-                    "method": r"^\s+(\w+)\s*\([^)]*\)\s*{",
-                },
-                "typescript": {
-                    "class": r"^class\s+(\w+)",
-                    "function": r"^function\s+(\w+)",
-                    "method": r"^\s+(\w+)\s*\([^)]*\)\s*{",
-                    "interface": r"^interface\s+(\w+)",
-                },
-            }
-            
-            # Use language-specific patterns if available, otherwise use generic ones
-            lang_patterns = patterns.get(language, {})
-            
-            for line_num, line in enumerate(content.splitlines(), 1):
-                for kind, pattern in lang_patterns.items():
-                    match = re.match(pattern, line)
-                    if match:
-                        name = match.group(1)
-                        tags.append(Tag(
-                            rel_fname=rel_fname,
-                            fname=fname,
-                            line=line_num,
-                            name=name,
-                            kind=kind
-                        ))
-            
-            return tags
+            for line_num, name, kind in _iter_fallback_matches(fname, language):
+                tags.append(Tag(
+                    rel_fname=rel_fname,
+                    fname=fname,
+                    line=line_num,
+                    name=sys.intern(name),
+                    kind=kind
+                ))
                 
         except Exception as e:
             if verbose:
                 io.tool_warning(f"Error parsing {fname} with regex: {e}")
-            return []
-            
-    return []
+            return
+    
+    yield from tags
 
 
-def get_tags(fname: str, rel_fname: str, cache, io: Any, verbose: bool = False) -> List[Tag]:
+def get_tags_raw(
+    fname: str,
+    rel_fname: str,
+    io: Any,
+    verbose: bool = False,
+    stat_cache: Optional[StatCache] = None,
+) -> List[Tag]:
+    """
+    Extract raw tags from a file.
+    
+    List-returning wrapper around iter_tags_raw for callers that cache or
+    index the result.
+    """
+    return list(iter_tags_raw(fname, rel_fname, io, verbose, stat_cache))
+
+
+def _parse_one(item: Tuple[str, str]) -> List[Tag]:
+    """Process pool worker: extract raw tags for a single (fname, rel_fname) pair."""
+    fname, rel_fname = item
+    return get_tags_raw(fname, rel_fname, None, False)
+
+
+def parse_files(
+    fnames: List[str],
+    rel_fnames: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None
+) -> Dict[str, List[Tag]]:
+    """
+    Extract raw tags from many files in parallel.
+    
+    Parsing is CPU-bound and independent per file, so the files are spread
+    over a process pool instead of being parsed one after another. Where a
+    process pool cannot be used (no multiprocessing support, or the pool
+    breaks), the files are parsed on a thread pool instead.
+    
+    Args:
+        fnames: Paths of the files to parse
+        rel_fnames: Relative paths matching fnames (defaults to fnames)
+        workers: Number of worker processes (defaults to the CPU count)
+        chunksize: Number of files handed to a worker at a time (defaults to
+            about four chunks per worker, so IPC is amortized on large inputs
+            while the last chunks still balance the load)
+        
+    Returns:
+        Dictionary mapping each file path to its list of tags
+    """
+    if rel_fnames is None:
+        rel_fnames = fnames
+    
+    items = list(zip(fnames, rel_fnames))
+    if chunksize is None:
+        chunksize = max(1, len(items) // (4 * (workers or os.cpu_count() or 1)))
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            results = executor.map(_parse_one, items, chunksize=chunksize)
+            return dict(zip(fnames, results))
+    except (OSError, ImportError, NotImplementedError, BrokenProcessPool):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(fnames, executor.map(_parse_one, items)))
+
+
+def get_tags(
+    fname: str,
+    rel_fname: str,
+    cache,
+    io: Any,
+    verbose: bool = False,
+    stat_cache: Optional[StatCache] = None,
+) -> List[Tag]:
     """
     Get tags for a file, using the cache if available.
     
-    This is a wrapper around get_tags_raw that handles caching.
+    This is a wrapper around get_tags_raw that handles caching. stat_cache
+    is an optional per-run StatCache shared with other callers.
     """
-    if not os.path.isfile(fname):
+    if stat_cache is None:
+        stat_cache = StatCache()
+    if not stat_cache.isfile(fname):
         return []
     
-    # Get file modification time for cache validation
-    mtime = os.path.getmtime(fname)
+    # Modification time and size validate the cache without reading the file
+    st = stat_cache.stat(fname)
+    mtime, size = st.st_mtime, st.st_size
     
     # Try to get from cache first
-    cached_tags = cache.get_cached_tags(rel_fname, mtime)
+    cached_tags = cache.get_cached_tags(rel_fname, mtime, size)
     if cached_tags is not None:
         return cached_tags
     
-    # Extract tags and cache them
-    tags = get_tags_raw(fname, rel_fname, io, verbose)
-    cache.save_tags_to_cache(rel_fname, mtime, tags)
+    # Content that is unchanged under a new mtime is still a cache hit. The
+    # digest is saved with freshly parsed tags too, so the first mtime change
+    # after a cold run already hits; only files the cache has an entry for
+    # are looked up by it
+    digest = file_digest(fname)
+    if cache.has_entry(rel_fname):
+        cached_tags = cache.get_cached_tags_by_digest(rel_fname, mtime, digest, size)
+        if cached_tags is not None:
+            return cached_tags
+    
+    # Extract tags and cache them; the file was stat'ed above
+    tags = get_tags_raw(fname, rel_fname, io, verbose, stat_cache)
+    cache.save_tags_to_cache(rel_fname, mtime, tags, digest, size)
     
     return tags
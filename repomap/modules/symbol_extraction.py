@@ -4,16 +4,55 @@ Symbol extraction and processing for RepoMap.
 """
 import os
 import re
+from bisect import bisect_right
 from collections import defaultdict, Counter
+from functools import lru_cache
+from itertools import accumulate, groupby
+from operator import attrgetter
 from typing import List, Dict, Set, Tuple, Any, Optional
 
 from .models import Tag
 
+# Tag kinds that declare a symbol and earn a ranking bonus
+_DECLARATION_KINDS = frozenset({
+    "class", "function", "method", "variable", "constant",
+    "interface", "enum", "struct", "module"
+})
+
+
+def _rank_sort_keys(tags: List[Tag], scores: List[int]) -> List[Any]:
+    """
+    Build sort keys that order tags by (-score, rel_fname, line).
+    
+    When every line is an int, each key packs the score, the rank of the
+    file name among the distinct file names and the line into a single
+    integer; comparing those is much cheaper than comparing tuples whose
+    file names share long prefixes. Other tags get the tuples themselves.
+    """
+    lines = [tag.line for tag in tags]
+    try:
+        if not all(type(line) is int for line in lines):
+            raise TypeError("non-integer line numbers")
+        file_ranks = {
+            rel_fname: rank
+            for rank, rel_fname in enumerate(sorted({tag.rel_fname for tag in tags}))
+        }
+        file_count = len(file_ranks)
+        low = min(lines, default=0)
+        span = max(lines, default=0) - low + 1
+        return [
+            (-score * file_count + file_ranks[tag.rel_fname]) * span + line - low
+            for score, tag, line in zip(scores, tags, lines)
+        ]
+    except TypeError:
+        # Line numbers or file names that do not pack into an integer
+        return [(-score, tag.rel_fname, line) for score, tag, line in zip(scores, tags, lines)]
+
 
 def get_ranked_tags(tags: List[Tag], 
                    chat_rel_fnames: Set[str] = None, 
                    mentioned_fnames: Set[str] = None,
-                   mentioned_idents: Set[str] = None) -> Tuple[List[Tag], Dict[str, int]]:
+                   mentioned_idents: Set[str] = None) -> Tuple[List[Tag], Dict[Tag, int]]:
     """
     Rank tags based on various criteria.
     
@@ -33,53 +72,68 @@ def get_ranked_tags(tags: List[Tag],
     if mentioned_idents is None:
         mentioned_idents = set()
     
-    # Track which tags define which symbols
-    defines = defaultdict(set)
-    definitions = defaultdict(set)
+    # Compute importance scores by tag position
+    scores = []
     
-    # Find all mentions and definitions
     for tag in tags:
-        key = (tag.rel_fname, tag.name, tag.kind)
+        rel_fname, name, kind = tag.rel_fname, tag.name, tag.kind
         
-        # Track which file defines each symbol
-        defines[tag.name].add(tag.rel_fname)
-        definitions[key].add(tag)
-    
-    # Compute importance scores
-    scores = defaultdict(int)
-    
-    for tag in tags:
         # Base score for being a symbol
-        scores[tag] = 1
+        score = 1
         
         # Bonus for being in a chat file
-        if tag.rel_fname in chat_rel_fnames:
-            scores[tag] += 10
+        if rel_fname in chat_rel_fnames:
+            score += 10
         
         # Bonus for being in a mentioned file
-        if tag.rel_fname in mentioned_fnames:
-            scores[tag] += 5
+        if rel_fname in mentioned_fnames:
+            score += 5
         
         # Bonus for being a mentioned identifier
-        if tag.name in mentioned_idents:
-            scores[tag] += 10
+        if name in mentioned_idents:
+            score += 10
         
         # Bonus for declarations
-        if tag.kind in ["class", "function", "method", "variable", "constant", 
-                      "interface", "enum", "struct", "module"]:
-            scores[tag] += 3
+        if kind in _DECLARATION_KINDS:
+            score += 3
+            
+            # Special bonus for main functions
+            if kind == "function" and name == "main":
+                score += 5
         
-        # Special bonus for main functions
-        if tag.name == "main" and tag.kind == "function":
-            scores[tag] += 5
-    
-    # Sort by score (descending) and then by line number (ascending)
-    ranked_tags = sorted(
-        tags, 
-        key=lambda t: (-scores[t], t.rel_fname, t.line)
-    )
+        scores.append(score)
+    
+    # Sort by score (descending) and then by file and line number (ascending)
+    sort_keys = _rank_sort_keys(tags, scores)
+    order = sorted(range(len(sort_keys)), key=sort_keys.__getitem__)
+    ranked_tags = [tags[i] for i in order]
     
-    return ranked_tags, scores
+    return ranked_tags, defaultdict(int, zip(tags, scores))
+
+
+def _fit_lines(lines: List[str], budget: int, token_counter=None) -> Tuple[int, int]:
+    """
+    Count how many leading lines fit in a token budget.
+    
+    With the default len // 4 estimate (token_counter None) the running
+    totals come from one accumulate pass and the cutoff from a bisection;
+    other counters are called line by line only until the budget runs out.
+    
+    Returns:
+        Tuple of (number of lines that fit, tokens they use)
+    """
+    if token_counter is None:
+        totals = list(accumulate(len(line) // 4 for line in lines))
+        fit = bisect_right(totals, budget)
+        return fit, totals[fit - 1] if fit else 0
+    
+    used = 0
+    for fit, line in enumerate(lines):
+        tokens = token_counter(line)
+        if used + tokens > budget:
+            return fit, used
+        used += tokens
+    return len(lines), used
 
 
 def generate_symbol_map(ranked_tags: List[Tag], 
@@ -98,21 +152,27 @@ def generate_symbol_map(ranked_tags: List[Tag],
     Returns:
         String containing the symbol map
     """
+    # Tag lines are budgeted in bulk when the default estimate is used
     if token_counter is None:
+        line_counter = None
+        
         # Default token counter (rough estimate)
         def token_counter(s):
             return len(s) // 4
+    else:
+        # Real tokenizers are comparatively slow per call, and tag lines
+        # such as "  1: module __init__" recur across files
+        token_counter = line_counter = lru_cache(maxsize=4096)(token_counter)
     
-    # Group tags by file
-    files = defaultdict(list)
-    for tag in ranked_tags:
-        files[tag.rel_fname].append(tag)
-    
-    # Sort files by importance (sum of tag scores)
-    file_scores = {
-        fname: sum(scores[tag] for tag in tags)
-        for fname, tags in files.items()
-    }
+    # One stable sort by (file, line) groups the tags by file, each file's
+    # already in line order; a file's importance is the sum of its tag scores
+    files = {}
+    file_scores = {}
+    for rel_fname, file_tags in groupby(
+        sorted(ranked_tags, key=attrgetter('rel_fname', 'line')), key=attrgetter('rel_fname')
+    ):
+        files[rel_fname] = file_tags = list(file_tags)
+        file_scores[rel_fname] = sum(map(scores.__getitem__, file_tags))
     
     # Sort by score and then by name
     sorted_files = sorted(
@@ -123,6 +183,7 @@ def generate_symbol_map(ranked_tags: List[Tag],
     # Build the map
     result = ["Repository symbols:"]
     token_count = token_counter("\n".join(result))
+    ellipsis_tokens = token_counter("  ...")
     
     for fname in sorted_files:
         # Check if adding this file would exceed the token limit
@@ -135,22 +196,23 @@ def generate_symbol_map(ranked_tags: List[Tag],
         result.append(file_line)
         token_count += file_tokens
         
-        # Sort tags by line number
-        file_tags = sorted(files[fname], key=lambda t: t.line)
+        file_tags = files[fname]
+        remaining = max_tokens - token_count
+        if line_counter is None and remaining < len(file_tags):
+            # Every tag line is at least 5 characters, i.e. 1 estimated
+            # token, so at most remaining + 1 of them need formatting
+            file_tags = file_tags[:max(remaining, 0) + 1]
         
-        for tag in file_tags:
-            # Format the tag
-            tag_line = f"  {tag.line}: {tag.kind} {tag.name}"
-            tag_tokens = token_counter(tag_line)
-            
-            if token_count + tag_tokens > max_tokens:
-                # Add ellipsis to indicate truncation
-                result.append("  ...")
-                token_count += token_counter("  ...")
-                break
-                
-            result.append(tag_line)
-            token_count += tag_tokens
+        # Format the tags and keep those that fit
+        tag_lines = [f"  {tag.line}: {tag.kind} {tag.name}" for tag in file_tags]
+        fit, fit_tokens = _fit_lines(tag_lines, remaining, line_counter)
+        result.extend(tag_lines[:fit])
+        token_count += fit_tokens
+        
+        if fit < len(files[fname]):
+            # Add ellipsis to indicate truncation
+            result.append("  ...")
+            token_count += ellipsis_tokens
     
     # Add note about token limit if necessary
     if token_count >= max_tokens:
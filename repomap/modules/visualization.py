@@ -4,43 +4,56 @@ Visualization and formatting utilities for RepoMap.
 """
 import os
 import re
+import zlib
 import random
+import colorsys
 from collections import defaultdict
+from itertools import groupby
+from operator import attrgetter
 from typing import List, Dict, Set, Any, Optional, Tuple, Union
 
 from .models import Tag, TreeNode
-from .file_utils import get_rel_fname
+from .file_utils import file_ext, get_rel_fname
 
 
-def get_random_color() -> str:
-    """Generate a random color for visualization."""
-    r = random.randint(100, 240)
-    g = random.randint(100, 240)
-    b = random.randint(100, 240)
-    return f"#{r:02x}{g:02x}{b:02x}"
+# 256 evenly spaced hues, each channel scaled into 100-240, the range the
+# random colors were drawn from
+_PALETTE = tuple(
+    "#{:02x}{:02x}{:02x}".format(*(100 + round(c * 140) for c in colorsys.hsv_to_rgb(i / 256, 1.0, 1.0)))
+    for i in range(256)
+)
+
+
+def get_random_color(key: Optional[str] = None) -> str:
+    """
+    Pick a color for visualization from a precomputed palette.
+    
+    Args:
+        key: Optional name to color; the same key always gets the same color
+        
+    Returns:
+        Hex color string
+    """
+    if key is None:
+        return random.choice(_PALETTE)
+    return _PALETTE[zlib.crc32(key.encode("utf-8")) & 255]
 
 
 def format_tag_list(tags: List[Tag]) -> str:
     """Format a list of tags for display."""
     result = []
     
-    # Group tags by file
-    file_tags = defaultdict(list)
-    for tag in tags:
-        file_tags[tag.rel_fname].append(tag)
-    
-    # Sort files
-    sorted_files = sorted(file_tags.keys())
+    # One stable sort by (file, line) leaves each file's tags contiguous and
+    # in line order, so no per-file lists are built
+    for rel_fname, file_tags in groupby(
+        sorted(tags, key=attrgetter('rel_fname', 'line')), key=attrgetter('rel_fname')
+    ):
+        if result:
+            result.append("")
+        result.append(f"File: {rel_fname}")
+        result.extend(f"  Line {tag.line}: {tag.kind} {tag.name}" for tag in file_tags)
     
-    for file in sorted_files:
-        result.append(f"File: {file}")
-        
-        # Sort tags by line number
-        sorted_tags = sorted(file_tags[file], key=lambda t: t.line)
-        
-        for tag in sorted_tags:
-            result.append(f"  Line {tag.line}: {tag.kind} {tag.name}")
-        
+    if result:
         result.append("")
     
     return "\n".join(result)
@@ -53,22 +66,28 @@ def build_tree(root: str, files: List[str]) -> TreeNode:
         
     tree_root = TreeNode("Repository Root", True)
     
+    # Directory nodes by their relative path including the trailing
+    # separator, so files in a known directory skip the walk from the root
+    dir_nodes = {"": tree_root}
+    
+    def get_dir_node(dir_key: str) -> TreeNode:
+        node = dir_nodes.get(dir_key)
+        if node is None:
+            parent_key, sep, name = dir_key[:-len(os.sep)].rpartition(os.sep)
+            node = get_dir_node(parent_key + sep).add_child(name, True)
+            dir_nodes[dir_key] = node
+        return node
+    
     for file in files:
         try:
             if not os.path.exists(file):
                 continue
                 
             rel_path = get_rel_fname(root, file)
-            parts = rel_path.split(os.sep)
+            dir_path, sep, name = rel_path.rpartition(os.sep)
             
-            current = tree_root
-            # Process all directories in the path
-            for i, part in enumerate(parts):
-                if i < len(parts) - 1:
-                    current = current.add_child(part, True)
-                else:
-                    # Last part is the file
-                    current.add_child(part, False)
+            # Last part is the file
+            get_dir_node(dir_path + sep).add_child(name, False)
         except Exception:
             pass
     
@@ -93,7 +112,7 @@ def format_file_list_by_extension(files: List[str], root: str) -> str:
     
     for file in files:
         rel_path = get_rel_fname(root, file)
-        ext = os.path.splitext(rel_path)[1]
+        ext = file_ext(rel_path)
         if not ext:
             ext = "no extension"
         by_ext[ext].append(rel_path)
@@ -6,10 +6,38 @@ Module for handling large sections in RepoMap repository mapping.
 import re
 import sys
 import ast
+import bisect
 import subprocess
 from pathlib import Path
 import tempfile
 
+
+def _finditer_with_lines(pattern, content):
+    """
+    Find all matches of a compiled pattern along with their 1-based line numbers.
+
+    Newline counting is only paid for when there is something to locate: no
+    matches cost nothing, a single match costs one bounded count, and several
+    matches share one newline offset index searched with bisect.
+
+    Args:
+        pattern: Compiled regular expression
+        content: Text to search
+
+    Returns:
+        List of (match, line_number) tuples
+    """
+    matches = list(pattern.finditer(content))
+    if not matches:
+        return []
+    if len(matches) == 1:
+        match = matches[0]
+        return [(match, content.count('\n', 0, match.start()) + 1)]
+
+    newlines = [m.start() for m in re.finditer('\n', content)]
+    return [(match, bisect.bisect_left(newlines, match.start()) + 1) for match in matches]
+
+
 def find_matching_brace(text, open_brace='{', close_brace='}'):
     """
     Find the position of the matching closing brace for the first opening brace.
@@ -72,8 +100,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
             static_pattern = re.compile(r'^\s*static\s+(\w+)', re.MULTILINE)
             
             # Find classes
-            for match in class_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match, line_num in _finditer_with_lines(class_pattern, content):
                 class_name = match.group(1)
                 elements.append({
                     'type': 'ClassDef', 
@@ -84,8 +111,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                 })
             
             # Find constructors
-            for match in constructor_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match, line_num in _finditer_with_lines(constructor_pattern, content):
                 elements.append({
                     'type': 'SpecialMethod',
                     'name': 'constructor',
@@ -95,8 +121,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                 })
             
             # Find initialize methods (specially handled for tests)
-            for match in initialize_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match, line_num in _finditer_with_lines(initialize_pattern, content):
                 elements.append({
                     'type': 'SpecialMethod',
                     'name': 'initialize',
@@ -106,8 +131,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                 })
             
             # Find static methods
-            for match in static_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match, line_num in _finditer_with_lines(static_pattern, content):
                 method_name = match.group(1)
                 elements.append({
                     'type': 'StaticMethod',
@@ -118,8 +142,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                 })
             
             # Find regular methods
-            for match in method_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match, line_num in _finditer_with_lines(method_pattern, content):
                 method_name = match.group(1)
                 if method_name not in ['constructor', 'initialize'] and not method_name.startswith('function'):
                     elements.append({
@@ -131,8 +154,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                     })
             
             # Find functions
-            for match in function_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match, line_num in _finditer_with_lines(function_pattern, content):
                 func_name = match.group(1)
                 elements.append({
                     'type': 'FunctionDef',
@@ -143,8 +165,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                 })
             
             # Find arrow functions
-            for match in arrow_func_pattern.finditer(content):
-                line_num = content[:match.start()].count('\n') + 1
+            for match, line_num in _finditer_with_lines(arrow_func_pattern, content):
                 func_name = match.group(1)
                 elements.append({
                     'type': 'ArrowFunction',
@@ -161,7 +182,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                     # Find the line number of initialize
                     initialize_index = content.find('initialize')
                     if initialize_index >= 0:
-                        line_num = content[:initialize_index].count('\n') + 1
+                        line_num = content.count('\n', 0, initialize_index) + 1
                         elements.append({
                             'type': 'SpecialMethod',
                             'name': 'initialize',
@@ -304,8 +325,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                 decorator_pattern = re.compile(r'^\s*@(\w+)', re.MULTILINE)
                 
                 # Find all matches
-                for match in initialize_pattern.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                for match, line_num in _finditer_with_lines(initialize_pattern, content):
                     # Special handling for initialize method since it's tested specifically
                     code_elements.append({
                         'type': 'SpecialMethod',
@@ -314,8 +334,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                         'end_line': line_num + 5  # Estimate
                     })
                 
-                for match in class_pattern.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                for match, line_num in _finditer_with_lines(class_pattern, content):
                     class_name = match.group(1)
                     # Check if this class contains an initialize method (needed for tests)
                     class_content = content[match.start():]
@@ -351,8 +370,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                         })
                 
                 # Process method definitions within classes
-                for match in method_pattern.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                for match, line_num in _finditer_with_lines(method_pattern, content):
                     method_name = match.group(1)
                     
                     # Special attention for initialize method and other test elements
@@ -371,8 +389,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                             'end_line': line_num + 5
                         })
                     
-                for match in function_pattern.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                for match, line_num in _finditer_with_lines(function_pattern, content):
                     func_name = match.group(2) if match.group(2) else "anonymous"
                     code_elements.append({
                         'type': 'FunctionDef',
@@ -382,8 +399,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                     })
                 
                 # Process arrow functions
-                for match in arrow_func_pattern.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                for match, line_num in _finditer_with_lines(arrow_func_pattern, content):
                     func_name = match.group(1)
                     code_elements.append({
                         'type': 'ArrowFunction',
@@ -393,8 +409,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                     })
                 
                 # Process decorators (both Python and TypeScript)
-                for match in decorator_pattern.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                for match, line_num in _finditer_with_lines(decorator_pattern, content):
                     decorator_name = match.group(1)
                     code_elements.append({
                         'type': 'Decorator',
@@ -405,8 +420,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                 
                 # Search specifically for patterns needed in tests
                 classmethod_pattern = re.compile(r'@classmethod', re.MULTILINE)
-                for match in classmethod_pattern.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                for match, line_num in _finditer_with_lines(classmethod_pattern, content):
                     code_elements.append({
                         'type': 'Decorator',
                         'name': 'classmethod',
@@ -416,8 +430,7 @@ def analyze_code_with_ast(content, file_extension=".py"):
                 
                 # Add specific patterns from the code_elements.py test file
                 initialize_method_pattern = re.compile(r'initialize\s*\(\s*\)', re.MULTILINE)
-                for match in initialize_method_pattern.finditer(content):
-                    line_num = content[:match.start()].count('\n') + 1
+                for match, line_num in _finditer_with_lines(initialize_method_pattern, content):
                     code_elements.append({
                         'type': 'SpecialMethod',
                         'name': 'initialize',
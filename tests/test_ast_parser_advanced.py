@@ -442,6 +442,17 @@ if __name__ == "__main__":
         # Should find property getters and setters
         self.assertIn("celsius", output)
         self.assertIn("fahrenheit", output)
+    
+    def test_cli_json_output(self):
+        """Test that --json prints results that parse back to the process_file output."""
+        import json
+        
+        result = self.run_ast_parser("*", "--line-numbers-only", "--json")
+        self.assertEqual(result.returncode, 0)
+        
+        data = json.loads(result.stdout)
+        expected = process_file(str(self.test_file_path), name_pattern="*", line_numbers_only=True)
+        self.assertEqual(data, expected)
 
 
 class TestAstParserEdgeCases(unittest.TestCase):
@@ -500,6 +511,124 @@ class TestAstParserEdgeCases(unittest.TestCase):
         results = process_file(str(binary_file), name_pattern="*")
         self.assertIn('error', results)
         
+    def test_match_name_pattern(self):
+        """Test wildcard, literal and catch-all name patterns."""
+        from repomap.ast_parser import match_name_pattern
+        
+        self.assertTrue(match_name_pattern("anything", "*"))
+        self.assertTrue(match_name_pattern("get_value", "get_value"))
+        self.assertFalse(match_name_pattern("get_value2", "get_value"))
+        self.assertTrue(match_name_pattern("get_value", "get_*"))
+        self.assertTrue(match_name_pattern("get_a", "get_?"))
+        self.assertFalse(match_name_pattern("set_value", "get_*"))
+        
+    def test_max_results(self):
+        """Test that the search stops after max_results matches."""
+        source_file = Path(self.temp_dir.name) / "duplicates.py"
+        source_file.write_text(
+            "class A:\n    def __init__(self):\n        pass\n\n"
+            "class B:\n    def __init__(self):\n        pass\n"
+        )
+        
+        results = process_file(str(source_file), name_pattern="__init__")
+        self.assertEqual(len(results['results']), 2)
+        
+        results = process_file(str(source_file), name_pattern="__init__", max_results=1)
+        self.assertEqual(len(results['results']), 1)
+        self.assertEqual(results['results'][0]['start_line'], 2)
+        
+    def test_source_lines_index(self):
+        """Test that the offset-backed line sequence behaves like a list of lines."""
+        from repomap.ast_parser import _SourceLines
+        
+        for text in ("", "a\n", "a\nb", "a\n\nbc\n", "\n\n", "é = 1\nπ = 2\n"):
+            expected = text.splitlines(keepends=True)
+            lines = _SourceLines(text.encode('utf-8'))
+            self.assertEqual(len(lines), len(expected))
+            self.assertEqual(list(lines), expected)
+            self.assertEqual(lines[1:3], expected[1:3])
+            self.assertEqual(lines[-1:], expected[-1:])
+        
+    def test_process_files_parallel(self):
+        """Test that parallel processing returns the same results per file."""
+        from repomap.ast_parser import process_files
+        
+        filenames = []
+        for i in range(3):
+            source_file = Path(self.temp_dir.name) / f"module_{i}.py"
+            source_file.write_text(f"def func_{i}():\n    pass\n\nvalue_{i} = {i}\n")
+            filenames.append(str(source_file))
+        
+        results = process_files(filenames, jobs=2, name_pattern="*", include_non_callables=True)
+        
+        self.assertEqual(list(results), filenames)
+        for filename in filenames:
+            expected = process_file(filename, name_pattern="*", include_non_callables=True)
+            self.assertEqual(results[filename], expected)
+        
+    def test_iter_nodes_from_ast(self):
+        """Test that matching nodes are yielded lazily with duplicate indexes."""
+        import ast
+        from repomap.ast_parser import iter_nodes_from_ast
+        
+        module_node = ast.parse("def f():\n    pass\n\ndef f():\n    pass\n")
+        nodes = iter_nodes_from_ast(module_node, name_pattern="f")
+        
+        first = next(nodes)
+        self.assertEqual((first['name'], first['lineno']), ("f", 1))
+        self.assertNotIn('duplicate_index', first)
+        self.assertEqual(next(nodes)['duplicate_index'], 1)
+        self.assertIsNone(next(nodes, None))
+        
+    def test_node_info_mapping_access(self):
+        """Test that NodeInfo supports the dict-style access used by callers."""
+        from repomap.ast_parser import NodeInfo
+        
+        node = NodeInfo("os", "ImportFrom", 3, 3, False, module="")
+        self.assertEqual(node['name'], "os")
+        self.assertEqual(node.get('module'), "")
+        self.assertIn('module', node)
+        self.assertNotIn('original_lineno', node)
+        self.assertIsNone(node.get('duplicate_index'))
+        self.assertEqual(node.get('unknown', 0), 0)
+        with self.assertRaises(KeyError):
+            node['original_lineno']
+        
+    def test_parsed_file_cache(self):
+        """Test that repeated queries reuse the parsed file until it changes."""
+        from repomap.ast_parser import _load_parsed
+        
+        source_file = Path(self.temp_dir.name) / "cached.py"
+        source_file.write_text("def first():\n    pass\n")
+        
+        _load_parsed.cache_clear()
+        process_file(str(source_file), name_pattern="*")
+        process_file(str(source_file), name_pattern="first", get_code=True)
+        self.assertEqual(_load_parsed.cache_info().misses, 1)
+        self.assertEqual(_load_parsed.cache_info().hits, 1)
+        
+        # A modified file is parsed again
+        source_file.write_text("def first():\n    pass\n\ndef second():\n    pass\n")
+        os.utime(source_file, ns=(0, os.stat(source_file).st_mtime_ns + 1_000_000_000))
+        results = process_file(str(source_file), name_pattern="*")
+        self.assertEqual([r['name'] for r in results['results']], ['first', 'second'])
+        self.assertEqual(_load_parsed.cache_info().misses, 2)
+    
+    def test_parsed_file_cache_unchanged_content(self):
+        """Test that touching a file without changing it reuses the parsed AST."""
+        from repomap.ast_parser import _load_parsed
+        
+        source_file = Path(self.temp_dir.name) / "touched.py"
+        source_file.write_text("def first():\n    pass\n")
+        st = os.stat(source_file)
+        first = _load_parsed(str(source_file), st.st_mtime_ns, st.st_size, (3, 10))
+        
+        os.utime(source_file, ns=(0, st.st_mtime_ns + 1_000_000_000))
+        st = os.stat(source_file)
+        second = _load_parsed(str(source_file), st.st_mtime_ns, st.st_size, (3, 10))
+        
+        self.assertIs(second[1], first[1])
+        
     def run_ast_parser(self, file_path, *args):
         """Run the ast_parser.py script with the given arguments."""
         try:
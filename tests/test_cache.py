@@ -144,5 +144,295 @@ class TestCache(unittest.TestCase):
             self.fail(f"Cache simulation failed: {e}")
 
 
+
+class TestTagsCache(unittest.TestCase):
+    """Tests for the SQLite tags cache in repomap.modules.cache"""
+
+    def setUp(self):
+        """Set up a cache in a temporary root directory"""
+        from repomap.modules.cache import Cache
+
+        self.root = tempfile.mkdtemp()
+        self.io = SimpleTestIO()
+        self.cache = Cache(self.io, root=self.root)
+
+    def tearDown(self):
+        """Close the cache and remove the temporary directory"""
+        self.cache.close()
+        shutil.rmtree(self.root)
+
+    def test_wal_mode(self):
+        """Test that the on-disk cache uses write-ahead logging"""
+        mode = self.cache.cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_close_truncates_wal(self):
+        """Test that closing the cache checkpoints and empties the WAL"""
+        for i in range(50):
+            self.cache.save_tags_to_cache(f"f{i}.py", 1.0, [f"tag{i}"])
+        self.cache.flush()
+        wal_path = str(self.cache._db_path) + "-wal"
+        self.assertGreater(os.path.getsize(wal_path), 0)
+
+        self.cache.close()
+        self.assertFalse(os.path.exists(wal_path) and os.path.getsize(wal_path))
+
+    def test_round_trip(self):
+        """Test that saved tags are returned for the same mtime only"""
+        self.assertTrue(self.cache.save_tags_to_cache("a.py", 1.5, ["tag"]))
+        self.assertEqual(self.cache.get_cached_tags("a.py", 1.5), ["tag"])
+        self.assertIsNone(self.cache.get_cached_tags("a.py", 2.5))
+
+    def test_compressed_storage(self):
+        """Test that repetitive tag lists are stored compressed and read back"""
+        from repomap.modules.models import Tag
+
+        tags = [Tag("pkg/mod.py", "/repo/pkg/mod.py", i, f"name{i % 7}", "def") for i in range(500)]
+        self.cache.save_tags_to_cache("pkg/mod.py", 1.0, tags)
+        self.cache.flush()
+        self.cache._mem.clear()
+
+        blob = self.cache.cursor.execute("SELECT tags FROM file_tags").fetchone()[0]
+        self.assertIn(blob[:1], (b"D", b"Z"))
+        self.assertEqual(self.cache.get_cached_tags("pkg/mod.py", 1.0), tags)
+
+    def test_async_lookup_of_large_blob(self):
+        """Test that large blobs are decoded on the pool and small hits resolve at once"""
+        from repomap.modules.models import Tag
+
+        tags = [Tag("big.py", "/repo/big.py", i, f"name{i}", "def") for i in range(20000)]
+        self.cache.save_tags_to_cache("big.py", 1.0, tags)
+        self.cache.save_tags_to_cache("small.py", 1.0, ["tag"])
+        self.cache.flush()
+        self.cache._mem.clear()
+
+        future = self.cache.get_cached_tags_async("big.py", 1.0)
+        self.assertEqual(future.result(timeout=10), tags)
+        self.assertIsNotNone(self.cache._decoder_pool)
+
+        small = self.cache.get_cached_tags_async("small.py", 1.0)
+        self.assertTrue(small.done())
+        self.assertEqual(small.result(), ["tag"])
+        self.assertIsNone(self.cache.get_cached_tags_async("missing.py", 1.0).result())
+
+    def test_prefetch_returns_cached_tags(self):
+        """Test that the prefetch hands back cached tags, large blobs included"""
+        from repomap.modules.map_generator import _prefetch_tags
+        from repomap.modules.models import Tag
+
+        fnames = []
+        for name in ("big.py", "small.py"):
+            fname = os.path.join(self.root, name)
+            with open(fname, "w") as f:
+                f.write("x = 1\n")
+            fnames.append(fname)
+        big_tags = [Tag("big.py", fnames[0], i, f"name{i}", "def") for i in range(20000)]
+        for fname, tags in zip(fnames, (big_tags, ["tag"])):
+            st = os.stat(fname)
+            self.cache.save_tags_to_cache(os.path.basename(fname), st.st_mtime, tags, size=st.st_size)
+        self.cache.flush()
+        self.cache._mem.clear()
+
+        found = _prefetch_tags({".py": fnames}, self.root, self.cache, self.io, False)
+        self.assertEqual(found, {fnames[0]: big_tags, fnames[1]: ["tag"]})
+
+    def test_prefetch_hashes_misses_only_when_parsing(self):
+        """Test that the prefetch hashes misses only when it parses them itself"""
+        from unittest import mock
+        from repomap.modules import map_generator
+        from repomap.modules.file_utils import file_digest
+
+        fname = os.path.join(self.root, "mod.py")
+        with open(fname, "w") as f:
+            f.write("x = 1\n")
+
+        with mock.patch.object(map_generator, "file_digest", side_effect=AssertionError("hashed")):
+            self.assertEqual(map_generator._prefetch_tags({".py": [fname]}, self.root, self.cache, self.io, False), {})
+
+        with mock.patch.object(map_generator, "PARALLEL_PARSE_THRESHOLD", 0), \
+                mock.patch.object(map_generator, "parse_files", return_value={fname: ["tag"]}):
+            found = map_generator._prefetch_tags({".py": [fname]}, self.root, self.cache, self.io, False)
+        self.assertEqual(found, {fname: ["tag"]})
+        self.assertEqual(self.cache._pending["mod.py"][3], file_digest(fname))
+
+    def test_known_entries_survive_reopen(self):
+        """Test that entries written by an earlier run are found without a save"""
+        from repomap.modules.cache import Cache
+
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"])
+        self.cache.close()
+
+        self.cache = Cache(self.io, root=self.root)
+        self.assertIn(("a.py", 1.0), self.cache._known)
+        self.assertEqual(self.cache.get_cached_tags("a.py", 1.0), ["a"])
+        self.assertIsNone(self.cache.get_cached_tags("b.py", 1.0))
+
+    def test_repomap_closes_cache_when_collected(self):
+        """Test that dropping a RepoMap flushes and closes its cache"""
+        import gc
+        from repomap.modules.core import RepoMap
+
+        rm = RepoMap(io=self.io, root=self.root, map_tokens=4096)
+        cache = rm.cache
+        cache.save_tags_to_cache("a.py", 1.0, ["a"])
+        del rm
+        gc.collect()
+
+        self.assertIsNone(cache.conn)
+        cache.close()  # Closing again is a no-op
+        count = self.cache.cursor.execute("SELECT COUNT(*) FROM file_tags").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_content_digest_survives_mtime_change(self):
+        """Test that unchanged content is found by digest after its mtime changes"""
+        from repomap.modules.cache import Cache
+
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"], digest="d1")
+        self.assertEqual(self.cache.get_cached_tags_by_digest("a.py", 2.0, "d1"), ["a"])
+        self.assertIsNone(self.cache.get_cached_tags_by_digest("a.py", 3.0, "d2"))
+        self.cache.close()
+
+        # The hit was re-saved under the new mtime
+        self.cache = Cache(self.io, root=self.root)
+        self.assertEqual(self.cache.get_cached_tags("a.py", 2.0), ["a"])
+        self.assertIsNone(self.cache.get_cached_tags("a.py", 4.0))
+        self.assertEqual(self.cache.get_cached_tags_by_digest("a.py", 4.0, "d1"), ["a"])
+        self.assertIsNone(self.cache.get_cached_tags_by_digest("a.py", 4.0, None))
+
+    def test_has_entry(self):
+        """Test that has_entry reports stored paths whatever their mtime"""
+        from repomap.modules.cache import Cache
+
+        self.assertFalse(self.cache.has_entry("a.py"))
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"])
+        self.assertTrue(self.cache.has_entry("a.py"))
+        self.cache.close()
+
+        self.cache = Cache(self.io, root=self.root)
+        self.assertTrue(self.cache.has_entry("a.py"))
+        self.assertFalse(self.cache.has_entry("b.py"))
+
+    def test_size_change_is_a_miss(self):
+        """Test that a different file size invalidates an entry with the same mtime"""
+        from repomap.modules.cache import Cache
+
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"], size=10)
+        self.assertEqual(self.cache.get_cached_tags("a.py", 1.0, 10), ["a"])
+        self.assertIsNone(self.cache.get_cached_tags("a.py", 1.0, 11))
+        self.cache.close()
+
+        self.cache = Cache(self.io, root=self.root)
+        self.assertIsNone(self.cache.get_cached_tags("a.py", 1.0, 11))
+        self.assertEqual(self.cache.get_cached_tags("a.py", 1.0, 10), ["a"])
+        # Callers that do not know the size match on mtime alone
+        self.assertEqual(self.cache.get_cached_tags("a.py", 1.0), ["a"])
+
+    def test_batched_saves(self):
+        """Test that saves are visible before and written after flush"""
+        from repomap.modules.cache import Cache
+
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"])
+        self.cache.save_tags_to_cache("b.py", 1.0, ["b"])
+
+        count = self.cache.cursor.execute("SELECT COUNT(*) FROM file_tags").fetchone()[0]
+        self.assertEqual(count, 0)
+        self.assertEqual(self.cache.get_cached_tags("a.py", 1.0), ["a"])
+
+        self.assertTrue(self.cache.flush())
+        count = self.cache.cursor.execute("SELECT COUNT(*) FROM file_tags").fetchone()[0]
+        self.assertEqual(count, 2)
+
+        # Pending saves are written on close
+        self.cache.save_tags_to_cache("c.py", 1.0, ["c"])
+        self.cache.close()
+        self.cache = Cache(self.io, root=self.root)
+        self.assertEqual(self.cache.get_cached_tags("c.py", 1.0), ["c"])
+
+    def test_failed_flush_keeps_pending_saves(self):
+        """Test that a flush that cannot take the write lock is retried later"""
+        import sqlite3
+
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"])
+        self.cache.conn.execute("PRAGMA busy_timeout=0")
+        blocker = sqlite3.connect(os.path.join(self.cache.cache_dir, "cache.db"), isolation_level=None)
+        try:
+            blocker.execute("BEGIN IMMEDIATE")
+            self.assertFalse(self.cache.flush())
+            self.assertIn("a.py", self.cache._pending)
+            blocker.execute("ROLLBACK")
+        finally:
+            blocker.close()
+
+        self.assertTrue(self.cache.flush())
+        self.assertEqual(self.cache._pending, {})
+        count = self.cache.cursor.execute("SELECT COUNT(*) FROM file_tags").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_tag_encoding(self):
+        """Test that tag lists round-trip through the compact encoding"""
+        from repomap.modules.cache import _encode_tags, _decode_tags, _TAGS_MAGIC
+        from repomap.modules.models import Tag
+
+        tags = [
+            Tag("pkg/mod.py", "/src/pkg/mod.py", 3, "Widget", "class"),
+            Tag("pkg/mod.py", "/src/pkg/mod.py", 7, "render", "method"),
+            Tag("pkg/mod.py", "/src/pkg/mod.py", 9, "Widget", "ref"),
+        ]
+        blob = _encode_tags(tags)
+        self.assertTrue(blob.startswith(_TAGS_MAGIC))
+        self.assertEqual(_decode_tags(blob), tags)
+        self.assertEqual(_decode_tags(_encode_tags([])), [])
+
+        # Anything that is not a list of Tag falls back to pickle
+        self.assertEqual(_decode_tags(_encode_tags({"a": 1})), {"a": 1})
+        odd = [Tag("a.py", "a.py", None, "x", "def")]
+        self.assertEqual(_decode_tags(_encode_tags(odd)), odd)
+
+    def test_reads_from_other_threads(self):
+        """Test that other threads read through their own connections"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"])
+        self.cache.flush()
+        self.cache._mem.clear()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda _: self.cache.get_cached_tags("a.py", 1.0), range(8)
+            ))
+
+        self.assertEqual(results, [["a"]] * 8)
+        self.assertGreaterEqual(len(self.cache._reader_conns), 1)
+
+    def test_memory_layer(self):
+        """Test that repeated lookups are served from memory without SQLite"""
+        from unittest import mock
+
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"])
+        self.cache.flush()
+
+        with mock.patch.object(self.cache, "_get_conn") as get_conn:
+            self.assertEqual(self.cache.get_cached_tags("a.py", 1.0), ["a"])
+            get_conn.assert_not_called()
+
+        # A different mtime is not served from memory
+        self.assertIsNone(self.cache.get_cached_tags("a.py", 2.0))
+
+    def test_schema_version(self):
+        """Test that a cache from another version is cleared on load"""
+        from repomap.modules.cache import Cache
+        from repomap.modules.config import CACHE_VERSION
+
+        version = self.cache.cursor.execute("PRAGMA user_version").fetchone()[0]
+        self.assertEqual(version, CACHE_VERSION)
+
+        self.cache.save_tags_to_cache("a.py", 1.0, ["a"])
+        self.cache.flush()
+        self.cache.cursor.execute(f"PRAGMA user_version = {CACHE_VERSION - 1}")
+        self.cache.close()
+
+        self.cache = Cache(self.io, root=self.root)
+        self.assertIsNone(self.cache.get_cached_tags("a.py", 1.0))
+
 if __name__ == '__main__':
     unittest.main()
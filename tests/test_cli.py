@@ -6,6 +6,7 @@ Integration tests for RepoMap CLI functionality
 import os
 import sys
 import unittest
+import shutil
 import subprocess
 from pathlib import Path
 from unittest import mock
@@ -115,6 +116,27 @@ class TestCLI(unittest.TestCase):
         # Check that sys.exit was called (parser.print_help does this)
         mock_exit.assert_called()
 
+    def test_main_flushes_status_output_on_error(self):
+        """Test that buffered status lines are written out when mapping fails"""
+        import io
+        import repomap.__main__ as cli
+
+        stdout = io.StringIO()
+
+        def make_io(**kwargs):
+            return InputOutput(stdout=stdout, stderr=io.StringIO(), **kwargs)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = Path(temp_dir, "main.py")
+            source.write_text("def main(): pass")
+            with mock.patch.object(cli, "InputOutput", side_effect=make_io), \
+                    mock.patch.object(cli.RepoMap, "get_repo_map", side_effect=RuntimeError("boom")), \
+                    mock.patch("sys.argv", ["repomap", "--verbose", str(source)]):
+                with self.assertRaises(RuntimeError):
+                    cli.main()
+
+        self.assertIn("RepoMap initialized", stdout.getvalue())
+
     def test_output_file(self):
         """Test CLI with output redirection"""
         self.skipTest("Skipping CLI test due to environment limitations")
@@ -176,6 +198,244 @@ class TestCLI(unittest.TestCase):
             # Clean up
             temp_dir.cleanup()
 
+    def test_skip_tests_prunes_nested_directories(self):
+        """Test that ** patterns prune matching directories at any depth"""
+        from repomap.modules.file_utils import find_src_files
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "pkg" / "tests" / "unit").mkdir(parents=True)
+            (root / "tests").mkdir()
+            (root / "pkg" / "core.py").write_text("x = 1")
+            (root / "pkg" / "tests" / "unit" / "helpers.py").write_text("x = 1")
+            (root / "tests" / "helpers.py").write_text("x = 1")
+
+            all_files = find_src_files(str(root))
+            self.assertEqual(len(all_files), 3)
+
+            files = find_src_files(str(root), skip_tests=True)
+            self.assertEqual(files, [str(root / "pkg" / "core.py")])
+
+    def test_trailing_slash_patterns_only_match_directories(self):
+        """Test that a pattern ending in / prunes directories but keeps files"""
+        from repomap.modules.file_utils import find_src_files
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "build").mkdir()
+            (root / "build" / "out.py").write_text("x = 1")
+            (root / "src").mkdir()
+            (root / "src" / "build").write_text("x = 1")
+
+            files = find_src_files(str(root), ignore_patterns=["build/"])
+            self.assertEqual(files, [str(root / "src" / "build")])
+
+    def test_stat_cache_filled_by_walk(self):
+        """Test that files found by the walk need no further stat calls"""
+        from repomap.modules.file_utils import StatCache, find_src_files, get_mtime
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "main.py"
+            path.write_text("x = 1")
+            stat_cache = StatCache()
+            files = find_src_files(temp_dir, stat_cache=stat_cache)
+            expected = path.stat().st_mtime
+
+            with mock.patch("os.stat", side_effect=AssertionError("stat called")):
+                self.assertEqual(get_mtime(files[0], stat_cache), expected)
+                self.assertTrue(stat_cache.isfile(files[0]))
+
+    def test_is_binary_file_by_extension_and_memo(self):
+        """Test that known extensions skip the read and unknown ones are read once"""
+        from repomap.modules import file_utils
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "data.unknownext").write_bytes(b"abc\0def")
+            (root / "notes.unknownext").write_text("plain text")
+
+            with mock.patch.object(file_utils, "is_text_file", wraps=file_utils.is_text_file) as sniff:
+                self.assertFalse(file_utils.is_binary_file(str(root / "main.py")))
+                self.assertTrue(file_utils.is_binary_file(str(root / "archive.zip")))
+                self.assertEqual(sniff.call_count, 0)
+
+                for _ in range(2):
+                    self.assertTrue(file_utils.is_binary_file(str(root / "data.unknownext")))
+                    self.assertFalse(file_utils.is_binary_file(str(root / "notes.unknownext")))
+                self.assertEqual(sniff.call_count, 2)
+
+    def test_expand_globs_deduplicates(self):
+        """Test that overlapping patterns yield each file once"""
+        from repomap.modules.file_utils import expand_globs
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "b.py").write_text("x = 1")
+            (root / "a.py").write_text("x = 1")
+            patterns = [str(root), str(root / "*.py"), str(root / "a.py")]
+
+            expected = [str(root / "a.py"), str(root / "b.py")]
+            self.assertEqual(expand_globs(patterns), expected)
+            self.assertEqual(sorted(expand_globs(patterns, sort=False)), expected)
+
+    def test_lower_ext_matches_splitext(self):
+        """Test that the extension helper agrees with os.path.splitext"""
+        from repomap.modules.file_utils import _lower_ext
+
+        for path in ["/a/b/c.PY", "/a/b.c/d", ".bashrc", "/x/..foo", "/x/.a.b",
+                     "a.b.", "", "/x/y/", "..", Path("img.Png")]:
+            self.assertEqual(_lower_ext(path), os.path.splitext(os.fspath(path))[1].lower())
+
+    def test_expand_globs_relative_to_root(self):
+        """Test that relative patterns fall back to the root and are globbed once for the cwd"""
+        from repomap.modules import file_utils
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "pkg").mkdir()
+            (root / "pkg" / "mod.py").write_text("x = 1")
+
+            pattern = os.path.join("pkg", "**", "*.py")
+            self.assertEqual(file_utils.expand_globs([pattern], root=temp_dir),
+                             [str(root / "pkg" / "mod.py")])
+
+            with mock.patch.object(file_utils.glob, "iglob", wraps=file_utils.glob.iglob) as iglob:
+                self.assertEqual(file_utils.expand_globs(["no_such_dir/*.zz"], root=os.getcwd()), [])
+                self.assertEqual(iglob.call_count, 1)
+
+    def test_clone_repo_reuses_cached_clone(self):
+        """Test that a second clone of a URL fetches into the cached directory"""
+        from repomap.modules import file_utils
+
+        def fake_git(args, **kwargs):
+            if args[1] == "clone":
+                os.makedirs(os.path.join(args[-1], ".git"))
+                Path(args[-1], "main.py").write_text("x = 1")
+
+        url = "https://github.com/example/project"
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch.object(file_utils, "CLONE_CACHE_DIR", temp_dir), \
+                mock.patch("subprocess.run", side_effect=fake_git) as run:
+            first = file_utils.clone_repo(url)
+            second = file_utils.clone_repo(url)
+
+            self.assertEqual(first, second)
+            self.assertTrue(first.startswith(temp_dir))
+            commands = [call.args[0][1:] for call in run.call_args_list]
+            self.assertEqual(commands[0][0], "clone")
+            self.assertEqual(commands[1][2:4], ["fetch", "--depth"])
+            self.assertEqual(commands[2][2:], ["reset", "--hard", "FETCH_HEAD"])
+
+    def test_clone_cache_evicts_least_recently_used(self):
+        """Test that old clones are removed once the cache exceeds its size limit"""
+        from repomap.modules import file_utils
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i, name in enumerate(["old", "mid", "new"]):
+                path = Path(temp_dir, name)
+                path.mkdir()
+                (path / "data").write_bytes(b"x" * 100)
+                os.utime(path, (i, i))
+
+            file_utils._evict_clones(temp_dir, os.path.join(temp_dir, "old"), 200)
+
+            self.assertEqual(sorted(os.listdir(temp_dir)), ["new", "old"])
+
+    def test_clone_cache_uses_recorded_sizes(self):
+        """Test that eviction reads each clone's recorded size instead of walking it"""
+        from repomap.modules import file_utils
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i, name in enumerate(["old", "new"]):
+                path = Path(temp_dir, name)
+                (path / ".git").mkdir(parents=True)
+                (path / "data").write_bytes(b"x" * 100)
+                self.assertEqual(file_utils._clone_size(str(path), refresh=True), 100)
+                os.utime(path, (i, i))
+
+            with mock.patch.object(file_utils, "_dir_size", side_effect=AssertionError("walked")):
+                file_utils._evict_clones(temp_dir, os.path.join(temp_dir, "new"), 150)
+
+            self.assertEqual(os.listdir(temp_dir), ["new"])
+
+    def test_clone_cache_skips_vanished_clones(self):
+        """Test that eviction skips clones that cannot be stat'ed"""
+        from repomap.modules import file_utils
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i, name in enumerate(["gone", "old", "new"]):
+                path = Path(temp_dir, name)
+                path.mkdir()
+                (path / "data").write_bytes(b"x" * 100)
+                os.utime(path, (i, i))
+
+            real_scandir = os.scandir
+
+            def scandir_then_remove(path):
+                # Another run removes "gone" right after the cache is listed
+                if path != temp_dir:
+                    return real_scandir(path)
+                entries = list(real_scandir(path))
+                shutil.rmtree(os.path.join(temp_dir, "gone"))
+                return entries
+
+            with mock.patch.object(file_utils.os, "scandir", side_effect=scandir_then_remove):
+                file_utils._evict_clones(temp_dir, os.path.join(temp_dir, "new"), 150)
+
+            self.assertEqual(os.listdir(temp_dir), ["new"])
+
+    def test_clone_cache_can_be_turned_off(self):
+        """Test that a zero size limit clones into a temporary directory"""
+        from repomap.modules import file_utils
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch.object(file_utils, "CLONE_CACHE_DIR", temp_dir), \
+                mock.patch.object(file_utils, "CLONE_CACHE_MAX_BYTES", 0), \
+                mock.patch("subprocess.run") as run:
+            target = file_utils.clone_repo("https://github.com/example/project")
+
+            self.assertFalse(target.startswith(temp_dir))
+            self.assertEqual(run.call_args.args[0][:2], ["git", "clone"])
+            self.assertEqual(os.listdir(temp_dir), [])
+            shutil.rmtree(target, ignore_errors=True)
+
+    def test_find_binary_files_matches_is_binary_file(self):
+        """Test that batched probing agrees with checking files one at a time"""
+        from repomap.modules.file_utils import find_binary_files, is_binary_file
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            paths = []
+            for i in range(6):
+                (root / f"data{i}.bin{i}").write_bytes(b"abc\0" if i % 2 else b"text")
+                paths.append(str(root / f"data{i}.bin{i}"))
+            paths += [str(root / "main.py"), str(root / "lib.so"), str(root / "missing.xyz")]
+
+            expected = {path for path in paths if is_binary_file(path)}
+            self.assertEqual(find_binary_files(paths, workers=4), expected)
+            self.assertEqual(find_binary_files(paths, workers=1), expected)
+
+    def test_find_src_files_threaded_order(self):
+        """Test that threaded scanning returns the same files in the same order"""
+        from repomap.modules.file_utils import find_src_files
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            for i in range(5):
+                sub = root / f"dir{i}" / "nested"
+                sub.mkdir(parents=True)
+                (sub.parent / f"a{i}.py").write_text("x = 1")
+                (sub / f"b{i}.py").write_text("x = 1")
+            (root / "top.py").write_text("x = 1")
+
+            expected = [
+                os.path.join(dirpath, name)
+                for dirpath, _, filenames in os.walk(str(root))
+                for name in filenames
+            ]
+            self.assertEqual(find_src_files(str(root), workers=1), expected)
+            self.assertEqual(find_src_files(str(root), workers=4), expected)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -77,6 +77,34 @@ class TestInputOutput(unittest.TestCase):
         io_handler.tool_error("Error still shows")
         self.assertEqual(stderr.getvalue(), "ERROR: Error still shows\n")  # Errors still show
     
+    def test_buffered_output(self):
+        """Test that buffered output is held until flush() is called."""
+        stdout = io.StringIO()
+        io_handler = InputOutput(stdout=stdout, stderr=io.StringIO(), buffered=True)
+        
+        io_handler.tool_output("First line")
+        io_handler.tool_output("Second line")
+        self.assertEqual(stdout.getvalue(), "")
+        
+        io_handler.flush()
+        self.assertEqual(stdout.getvalue(), "First line\nSecond line\n")
+        
+        # Flushing again does not repeat output
+        io_handler.flush()
+        self.assertEqual(stdout.getvalue(), "First line\nSecond line\n")
+    
+    def test_buffered_output_precedes_warnings(self):
+        """Test that a warning or error first writes out the buffered output."""
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        io_handler = InputOutput(stdout=stdout, stderr=stderr, buffered=True)
+        
+        io_handler.tool_output("Status")
+        io_handler.tool_warning("Careful")
+        self.assertEqual(stdout.getvalue(), "Status\n")
+        io_handler.tool_error("Failed")
+        self.assertEqual(stderr.getvalue(), "WARNING: Careful\nERROR: Failed\n")
+    
     def test_confirm_ask(self):
         """Test confirm_ask method."""
         # In the CLI version, confirm_ask always returns True
@@ -87,6 +87,68 @@ class TestModels(unittest.TestCase):
         # Test that token counting uses the approximate counter
         self.assertEqual(model.token_count("This is a test string"), 5)  # 20 chars // 4 = 5
 
+    
+    def test_chunk_text_by_tokens_batches_line_counts(self):
+        """Test that tiktoken line counts are computed in one batch call."""
+        model = Model()
+        model.encoding = mock.Mock()
+        model.encoding.encode.side_effect = lambda text: [0] * len(text.split())
+        model.encoding.encode_ordinary_batch.side_effect = (
+            lambda lines: [[0] * len(line.split()) for line in lines]
+        )
+        model._count_tokens = model._count_tokens_tiktoken
+        
+        text = "one two\nthree four\nfive six\n"
+        chunks = model.chunk_text_by_tokens(text, 4)
+        
+        self.assertEqual(chunks, ["one two\nthree four\n", "five six\n"])
+        model.encoding.encode_ordinary_batch.assert_called_once()
+
+    def test_chunk_text_by_tokens_uses_overridden_token_count(self):
+        """Test that an overridden token_count drives the line counts too."""
+        class WordModel(Model):
+            def token_count(self, text):
+                return len(text.split())
+
+        model = WordModel()
+        model.encoding = mock.Mock()
+        model._count_tokens = model._count_tokens_tiktoken
+
+        text = "one two\nthree four\nfive six\n"
+        self.assertEqual(model.chunk_text_by_tokens(text, 4), ["one two\nthree four\n", "five six\n"])
+        model.encoding.encode_ordinary_batch.assert_not_called()
+
+        # The same holds for a token_count replaced on the instance
+        model = Model()
+        model.token_count = lambda text: len(text.split())
+        self.assertEqual(model.chunk_text_by_tokens(text, 2), ["one two\n", "three four\n", "five six\n"])
+
+    def test_chunk_text_by_tokens_splits_long_line_evenly(self):
+        """Test that an oversized line is split into exactly the pieces it needs."""
+        with mock.patch.dict(sys.modules, {'tiktoken': None}):
+            model = Model()
+        
+        long_line = "x" * 41 + "\n"  # 10 approximate tokens
+        chunks = model.chunk_text_by_tokens("a\n" + long_line, 3)
+        
+        self.assertEqual(chunks[0], "a\n")
+        self.assertEqual(len(chunks), 5)  # "a\n" plus ceil(10 / 3) pieces
+        self.assertEqual("".join(chunks[1:]), long_line)
+        for chunk in chunks:
+            self.assertLessEqual(model.token_count(chunk), 3)
+    
+    def test_encoding_cached_per_model_name(self):
+        """Test that the tiktoken encoding is only loaded once per model name."""
+        from repomap import models
+        
+        fake_tiktoken = mock.Mock()
+        with mock.patch.dict(sys.modules, {'tiktoken': fake_tiktoken}), \
+                mock.patch.dict(models._ENC_CACHE, clear=True):
+            first = Model("gpt-4")
+            second = Model("gpt-4")
+        
+        fake_tiktoken.encoding_for_model.assert_called_once_with("gpt-4")
+        self.assertIs(first.encoding, second.encoding)
 
 if __name__ == "__main__":
     unittest.main()
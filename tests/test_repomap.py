@@ -11,7 +11,8 @@ from pathlib import Path
 
 # Make sure we can import the main package
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from repomap import RepoMap, get_scm_fname, filename_to_lang
+from repomap import RepoMap, get_scm_fname, filename_to_lang, filename_to_lang_bytes
+from repomap.modules.parsers import get_tags_raw, parse_files
 from repomap.modules.file_utils import get_rel_fname
 
 # Define test constants
@@ -93,6 +94,12 @@ def test_language_detection():
     assert filename_to_lang("test.unknown") is None
 
 
+def test_language_detection_bytes():
+    """Test that bytes filenames map to the same languages as str filenames"""
+    for name in ("test.py", "test.JS", "src/main.rs", "test.unknown", "Makefile"):
+        assert filename_to_lang_bytes(name.encode()) == filename_to_lang(name)
+
+
 def test_query_file_finding():
     """Test that we can find query files for languages"""
     # We know Python should have a query file
@@ -176,6 +183,165 @@ def test_get_tags_raw(repomap_fixture, monkeypatch):
     assert mock_scm_path.exists()
 
 
+def test_get_scm_fname_is_memoised(monkeypatch):
+    """Test that query lookups probe the filesystem once per language"""
+    calls = []
+    real_isfile = os.path.isfile
+
+    def counting_isfile(path):
+        calls.append(path)
+        return real_isfile(path)
+
+    get_scm_fname.cache_clear()
+    monkeypatch.setattr(os.path, "isfile", counting_isfile)
+    first = get_scm_fname("python")
+    probes = len(calls)
+    assert get_scm_fname("python") == first
+    assert len(calls) == probes > 0
+    get_scm_fname.cache_clear()
+
+
+def test_parse_files_matches_serial_parsing(tmp_path):
+    """Test that parallel parsing returns the same tags as parsing one file at a time"""
+    fnames = []
+    for i in range(3):
+        path = tmp_path / f"module_{i}.py"
+        path.write_text(f"class Widget{i}:\n    def run(self):\n        pass\n\ndef helper_{i}():\n    pass\n")
+        fnames.append(str(path))
+
+    parsed = parse_files(fnames, workers=2)
+
+    assert set(parsed) == set(fnames)
+    for fname in fnames:
+        assert parsed[fname] == get_tags_raw(fname, fname, None)
+
+
+def test_parse_files_falls_back_to_threads(tmp_path, monkeypatch):
+    """Test that parsing still works when a process pool cannot be started"""
+    from repomap.modules import parsers
+
+    def no_processes(*args, **kwargs):
+        raise NotImplementedError("no multiprocessing")
+
+    monkeypatch.setattr(parsers, "ProcessPoolExecutor", no_processes)
+    path = tmp_path / "module.py"
+    path.write_text("def helper():\n    pass\n")
+
+    parsed = parse_files([str(path)], workers=2)
+
+    assert parsed == {str(path): get_tags_raw(str(path), str(path), None)}
+
+
+def test_get_tags_raw_regex_fallback_keyword_filter(tmp_path, monkeypatch):
+    """Test the regex fallback only reports kinds whose keyword appears in the file"""
+    monkeypatch.setitem(sys.modules, "grep_ast", None)
+
+    no_defs = tmp_path / "constants.py"
+    no_defs.write_text("VALUE = 1\nOTHER = VALUE + 1\n")
+    assert get_tags_raw(str(no_defs), "constants.py", None) == []
+
+    only_class = tmp_path / "shapes.py"
+    only_class.write_text("class Shape:\n    sides = 0\n")
+    tags = get_tags_raw(str(only_class), "shapes.py", None)
+    assert [(tag.name, tag.kind, tag.line) for tag in tags] == [("Shape", "class", 1)]
+
+
+def test_get_tags_raw_regex_fallback_non_ascii(tmp_path, monkeypatch):
+    """Test the memory-mapped regex fallback handles non-ASCII text and empty files"""
+    monkeypatch.setitem(sys.modules, "grep_ast", None)
+
+    source = tmp_path / "unicode.py"
+    source.write_bytes("# café\nclass Café:\n    def naïve(self):\n        pass\n\xff\ndef ok(): pass\n".encode("utf-8").replace(b"\xc3\xbf", b"\xff"))
+    tags = get_tags_raw(str(source), "unicode.py", None)
+    assert [(tag.name, tag.kind, tag.line) for tag in tags] == [
+        ("Café", "class", 2), ("naïve", "method", 3), ("ok", "function", 6)
+    ]
+
+    empty = tmp_path / "empty.py"
+    empty.write_bytes(b"")
+    assert get_tags_raw(str(empty), "empty.py", None) == []
+
+
+def test_get_tags_raw_discards_partial_results(tmp_path, monkeypatch):
+    """Test that a parse error midway through a file yields no tags at all"""
+    from repomap.modules import parsers
+
+    monkeypatch.setitem(sys.modules, "grep_ast", None)
+
+    def failing_matches(fname, language):
+        yield 1, "first", "function"
+        raise ValueError("broken file")
+
+    monkeypatch.setattr(parsers, "_iter_fallback_matches", failing_matches)
+    source = tmp_path / "broken.py"
+    source.write_text("def first(): pass\n")
+    assert get_tags_raw(str(source), "broken.py", None) == []
+
+
+def test_get_tags_raw_import_error_while_parsing(tmp_path, monkeypatch):
+    """Test that an ImportError raised by tree-sitter does not also run the regex fallback"""
+    import types
+    from repomap.modules import parsers
+
+    def ast_grep(fname, query):
+        yield {"name": "first", "kind": "def", "line": 1}
+        raise ImportError("missing language binding")
+
+    monkeypatch.setitem(sys.modules, "grep_ast", types.SimpleNamespace(ast_grep=ast_grep))
+    monkeypatch.setattr(parsers, "_read_query", lambda scm_fname: "")
+    source = tmp_path / "module.py"
+    source.write_text("def first(): pass\n")
+    assert get_tags_raw(str(source), "module.py", None) == []
+
+
+def test_get_tags_stats_each_file_once(tmp_path, monkeypatch):
+    """Test that a cold cache miss in get_tags stats the file once and saves its digest"""
+    from unittest.mock import MagicMock
+    from repomap.modules import parsers
+    from repomap.modules.file_utils import StatCache, file_digest
+
+    monkeypatch.setitem(sys.modules, "grep_ast", None)
+    path = tmp_path / "module.py"
+    path.write_text("def helper():\n    pass\n")
+    cache = MagicMock()
+    cache.get_cached_tags.return_value = None
+    cache.has_entry.return_value = False
+
+    def unexpected(fname):
+        raise AssertionError(f"unexpected read of {fname}")
+
+    monkeypatch.setattr(parsers.os.path, "isfile", unexpected)
+    tags = parsers.get_tags(str(path), "module.py", cache, None, stat_cache=StatCache())
+
+    assert [(tag.name, tag.kind) for tag in tags] == [("helper", "function")]
+    # A file the cache has no entry for is not looked up by digest
+    cache.get_cached_tags_by_digest.assert_not_called()
+    cache.save_tags_to_cache.assert_called_once()
+    assert cache.save_tags_to_cache.call_args.args[3] == file_digest(str(path))
+
+
+def test_get_tags_first_touch_hits_by_digest(tmp_path, monkeypatch):
+    """Test that the first mtime change after a cold run is served from the cache"""
+    from repomap.modules import parsers
+    from repomap.modules.cache import Cache
+
+    monkeypatch.setitem(sys.modules, "grep_ast", None)
+    path = tmp_path / "module.py"
+    path.write_text("def helper():\n    pass\n")
+    cache = Cache(SimpleTestIO(), root=str(tmp_path))
+    try:
+        cold = parsers.get_tags(str(path), "module.py", cache, None)
+        st = path.stat()
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+
+        parsed = []
+        monkeypatch.setattr(parsers, "get_tags_raw", lambda *args: parsed.append(args) or [])
+        assert parsers.get_tags(str(path), "module.py", cache, None) == cold
+        assert parsed == []
+    finally:
+        cache.close()
+
+
 def test_get_ranked_tags_map_uncached(repomap_fixture, monkeypatch):
     """Test generating a repository map with the uncached method"""
     rm, _, _ = repomap_fixture
@@ -18,6 +18,7 @@ from pathlib import Path
 # Add parent directory to path to import repomap
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from repomap.section_splitting import (
+    _finditer_with_lines,
     find_matching_brace,
     analyze_code_with_ast,
     split_section_by_signatures,
@@ -86,6 +87,22 @@ class TestSectionSplitting(unittest.TestCase):
         position = find_matching_brace(content, open_brace='[', close_brace=']')
         self.assertEqual(position, content.index(']') + 1, "Failed to find matching square bracket")
     
+    def test_finditer_with_lines(self):
+        """Test line numbers reported for zero, one and many regex matches."""
+        import re
+        pattern = re.compile(r'^\s*class\s+(\w+)', re.MULTILINE)
+        
+        self.assertEqual(_finditer_with_lines(pattern, "const x = 5;\n"), [])
+        
+        single = _finditer_with_lines(pattern, "x = 1;\ny = 2;\nclass A {}\n")
+        self.assertEqual([(m.group(1), line) for m, line in single], [("A", 3)])
+        
+        content = "class A {}\n\nclass B {}\nfoo();\n  class C {}\n"
+        found = [(m.group(1), line) for m, line in _finditer_with_lines(pattern, content)]
+        expected = [(m.group(1), content[:m.start()].count('\n') + 1) for m in pattern.finditer(content)]
+        self.assertEqual(found, expected)
+        self.assertEqual(found, [("A", 1), ("B", 2), ("C", 5)])
+    
     def test_analyze_code_with_ast_python(self):
         """Test AST analysis with Python code."""
         python_code = """